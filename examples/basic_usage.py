@@ -2,6 +2,7 @@
 Basic usage example for the Penta CS Email Classification Agent
 """
 
+import logging
 import os
 import sys
 from datetime import datetime
@@ -16,6 +17,8 @@ from src.penta_cs_agent import (
     AgentConfig
 )
 
+logger = logging.getLogger(__name__)
+
 
 def main():
     """Demonstrate basic usage of the email classification agent"""
@@ -25,14 +28,12 @@ def main():
     config = AgentConfig()
     agent = EmailClassificationAgent(config=config)
 
-    print("=" * 80)
-    print("Penta Fine Ingredients - Email Classification Agent")
-    print("=" * 80)
-    print()
+    logger.info("=" * 80)
+    logger.info("Penta Fine Ingredients - Email Classification Agent")
+    logger.info("=" * 80)
+    logger.info("")
 
-    # Example 1: Quote Request
-    print("Example 1: Quote Request")
-    print("-" * 80)
+    # Example emails
     email1 = EmailClassification(
         subject="Request for quote - Citric Acid",
         body="""Hello,
@@ -54,18 +55,6 @@ john.smith@beveragecorp.com
         sender="john.smith@beveragecorp.com"
     )
 
-    result1 = agent.classify(email1)
-    print(f"Primary Category: {result1.primary_category.value}")
-    print(f"Confidence: {result1.confidence:.2%}")
-    print(f"Reasoning: {result1.reasoning}")
-    print(f"Extracted Entities: {result1.extracted_entities}")
-    print(f"Recommended Action: {result1.recommended_action}")
-    print(f"Priority: {result1.priority}")
-    print()
-
-    # Example 2: Order Status Inquiry
-    print("Example 2: Order Status Inquiry")
-    print("-" * 80)
     email2 = EmailClassification(
         subject="Order #12345 - Shipping Status?",
         body="""Hi,
@@ -79,18 +68,6 @@ Sarah Johnson
         sender="sarah.j@email.com"
     )
 
-    result2 = agent.classify(email2)
-    print(f"Primary Category: {result2.primary_category.value}")
-    print(f"Confidence: {result2.confidence:.2%}")
-    print(f"Reasoning: {result2.reasoning}")
-    print(f"Extracted Entities: {result2.extracted_entities}")
-    print(f"Recommended Action: {result2.recommended_action}")
-    print(f"Priority: {result2.priority}")
-    print()
-
-    # Example 3: Product Inquiry
-    print("Example 3: Product Inquiry")
-    print("-" * 80)
     email3 = EmailClassification(
         subject="Question about Ascorbic Acid specifications",
         body="""Hello Penta team,
@@ -111,18 +88,6 @@ Quality Manager
         sender="m.chen@nutra.com"
     )
 
-    result3 = agent.classify(email3)
-    print(f"Primary Category: {result3.primary_category.value}")
-    print(f"Confidence: {result3.confidence:.2%}")
-    print(f"Reasoning: {result3.reasoning}")
-    print(f"Extracted Entities: {result3.extracted_entities}")
-    print(f"Recommended Action: {result3.recommended_action}")
-    print(f"Priority: {result3.priority}")
-    print()
-
-    # Example 4: Sample Request
-    print("Example 4: Sample Request")
-    print("-" * 80)
     email4 = EmailClassification(
         subject="Sample request for testing",
         body="""Dear Penta,
@@ -140,26 +105,45 @@ R&D Director
         sender="l.martinez@foodtech.com"
     )
 
-    result4 = agent.classify(email4)
-    print(f"Primary Category: {result4.primary_category.value}")
-    print(f"Confidence: {result4.confidence:.2%}")
-    print(f"Reasoning: {result4.reasoning}")
-    print(f"Extracted Entities: {result4.extracted_entities}")
-    print(f"Recommended Action: {result4.recommended_action}")
-    print(f"Priority: {result4.priority}")
-    print()
+    examples = [
+        ("Example 1: Quote Request", email1),
+        ("Example 2: Order Status Inquiry", email2),
+        ("Example 3: Product Inquiry", email3),
+        ("Example 4: Sample Request", email4),
+    ]
+
+    # Classify all examples concurrently
+    results = agent.classify_many([email for _, email in examples])
+
+    for (title, _), result in zip(examples, results):
+        logger.info(title)
+        logger.info("-" * 80)
+        if isinstance(result, Exception):
+            logger.info("Classification failed: %s", result)
+            logger.info("")
+            continue
+        logger.info("Primary Category: %s", result.primary_category.value)
+        logger.info("Confidence: %.2f%%", result.confidence * 100)
+        logger.info("Reasoning: %s", result.reasoning)
+        logger.info("Extracted Entities: %s", result.extracted_entities)
+        logger.info("Recommended Action: %s", result.recommended_action)
+        logger.info("Priority: %s", result.priority)
+        logger.info("")
 
     # Get agent statistics
-    print("Agent Statistics")
-    print("-" * 80)
+    logger.info("Agent Statistics")
+    logger.info("-" * 80)
     stats = agent.get_statistics()
-    print(f"LLM Provider: {stats['llm_provider']}")
-    print(f"Model: {stats['model']}")
-    print(f"Tools Registered: {stats['tools_registered']}")
-    print(f"Learning Enabled: {stats['learning_enabled']}")
-    print(f"Knowledge Base Stats: {stats['knowledge_base']}")
-    print()
+    logger.info("LLM Provider: %s", stats['llm_provider'])
+    logger.info("Model: %s", stats['model'])
+    logger.info("Tools Registered: %s", stats['tools_registered'])
+    logger.info("Learning Enabled: %s", stats['learning_enabled'])
+    logger.info("Knowledge Base Stats: %s", stats['knowledge_base'])
+    logger.info("")
 
 
 if __name__ == "__main__":
+    # Only the example's own output; SDK request logs stay at WARNING
+    logging.basicConfig(level=logging.WARNING, format="%(message)s", stream=sys.stdout)
+    logger.setLevel(logging.INFO)
     main()
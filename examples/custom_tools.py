@@ -2,8 +2,11 @@
 Example showing how to add custom tools/functions for the agent to call
 """
 
+import logging
 import os
 import sys
+from bisect import bisect_right
+from types import MappingProxyType
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
@@ -14,14 +17,59 @@ from src.penta_cs_agent import (
 )
 from src.penta_cs_agent.tools import ToolRegistry
 
+logger = logging.getLogger(__name__)
+
+
+# Simulated lookup tables, built once at import time with lowercased keys
+# so each tool call is a single probe of a read-only mapping
+CUSTOMER_DB = MappingProxyType({
+    email.lower(): MappingProxyType(info) for email, info in {
+        "valued.customer@company.com": {
+            "total_orders": 25,
+            "account_status": "premium",
+            "last_order": "2024-11-15",
+            "total_spent": "$125,000"
+        },
+        "new.customer@startup.com": {
+            "total_orders": 0,
+            "account_status": "new",
+            "last_order": None,
+            "total_spent": "$0"
+        }
+    }.items()
+})
+
+UNKNOWN_CUSTOMER = MappingProxyType({
+    "total_orders": 0,
+    "account_status": "unknown",
+    "last_order": None,
+    "total_spent": "$0"
+})
+
+BASE_PRICES = MappingProxyType({
+    name.lower(): price for name, price in {
+        "Citric Acid": 2.50,
+        "Ascorbic Acid": 8.75,
+        "Sodium Benzoate": 3.25,
+        "Potassium Sorbate": 4.50
+    }.items()
+})
+
+DEFAULT_BASE_PRICE = 5.00
+
+# Volume discount tiers as sorted thresholds (kg) with the discount that
+# applies at or above each one; DISCOUNT_RATES[0] covers orders below all tiers
+DISCOUNT_THRESHOLDS = (1000, 5000, 10000)
+DISCOUNT_RATES = (0.0, 0.05, 0.10, 0.15)
+
 
 def main():
     """Demonstrate custom tool registration"""
 
-    print("=" * 80)
-    print("Custom Tools Example")
-    print("=" * 80)
-    print()
+    logger.info("=" * 80)
+    logger.info("Custom Tools Example")
+    logger.info("=" * 80)
+    logger.info("")
 
     # Create a custom tool registry
     custom_registry = ToolRegistry()
@@ -46,31 +94,7 @@ def main():
         Custom function to check customer history
         In production, this would query your CRM/database
         """
-        # Simulated customer data
-        customer_db = {
-            "valued.customer@company.com": {
-                "total_orders": 25,
-                "account_status": "premium",
-                "last_order": "2024-11-15",
-                "total_spent": "$125,000"
-            },
-            "new.customer@startup.com": {
-                "total_orders": 0,
-                "account_status": "new",
-                "last_order": None,
-                "total_spent": "$0"
-            }
-        }
-
-        customer_info = customer_db.get(
-            customer_email,
-            {
-                "total_orders": 0,
-                "account_status": "unknown",
-                "last_order": None,
-                "total_spent": "$0"
-            }
-        )
+        customer_info = CUSTOMER_DB.get(customer_email.lower(), UNKNOWN_CUSTOMER)
 
         return {
             "customer_email": customer_email,
@@ -101,26 +125,8 @@ def main():
         Get product pricing with volume discounts
         In production, this would query your pricing system
         """
-        # Simulated pricing database
-        base_prices = {
-            "citric acid": 2.50,
-            "ascorbic acid": 8.75,
-            "sodium benzoate": 3.25,
-            "potassium sorbate": 4.50
-        }
-
-        product_key = product_name.lower()
-        base_price = base_prices.get(product_key, 5.00)
-
-        # Volume discount tiers
-        if quantity >= 10000:
-            discount = 0.15
-        elif quantity >= 5000:
-            discount = 0.10
-        elif quantity >= 1000:
-            discount = 0.05
-        else:
-            discount = 0.0
+        base_price = BASE_PRICES.get(product_name.lower(), DEFAULT_BASE_PRICE)
+        discount = DISCOUNT_RATES[bisect_right(DISCOUNT_THRESHOLDS, quantity)]
 
         unit_price = base_price * (1 - discount)
         total_price = unit_price * quantity
@@ -133,10 +139,10 @@ def main():
             "discount_percent": discount * 100
         }
 
-    print(f"Registered {custom_registry.get_tool_count()} custom tools:")
+    logger.info("Registered %s custom tools:", custom_registry.get_tool_count())
     for tool_name in custom_registry.list_tools():
-        print(f"  - {tool_name}")
-    print()
+        logger.info("  - %s", tool_name)
+    logger.info("")
 
     # Initialize agent with custom tool registry
     config = AgentConfig()
@@ -160,22 +166,31 @@ Purchasing Manager
         sender="valued.customer@company.com"
     )
 
-    print("Classifying email with custom tools available...")
-    print()
-    result = agent.classify(email)
-
-    print(f"Primary Category: {result.primary_category.value}")
-    print(f"Confidence: {result.confidence:.2%}")
-    print(f"Reasoning: {result.reasoning}")
-    print(f"Extracted Entities: {result.extracted_entities}")
-    print(f"Recommended Action: {result.recommended_action}")
-    print(f"Priority: {result.priority}")
-    print()
-    print("Note: The agent can use the custom tools (check_customer_history,")
-    print("get_product_price) to provide more informed classifications and")
-    print("extract relevant information!")
-    print()
+    logger.info("Classifying email with custom tools available...")
+    logger.info("")
+
+    # Results stream in: a provisional category first, then the full result
+    for result in agent.classify_stream(email):
+        if not result.reasoning:
+            logger.info("Provisional Category: %s (%.2f%%)",
+                        result.primary_category.value, result.confidence * 100)
+            logger.info("")
+
+    logger.info("Primary Category: %s", result.primary_category.value)
+    logger.info("Confidence: %.2f%%", result.confidence * 100)
+    logger.info("Reasoning: %s", result.reasoning)
+    logger.info("Extracted Entities: %s", result.extracted_entities)
+    logger.info("Recommended Action: %s", result.recommended_action)
+    logger.info("Priority: %s", result.priority)
+    logger.info("")
+    logger.info("Note: The agent can use the custom tools (check_customer_history,")
+    logger.info("get_product_price) to provide more informed classifications and")
+    logger.info("extract relevant information!")
+    logger.info("")
 
 
 if __name__ == "__main__":
+    # Only the example's own output; SDK request logs stay at WARNING
+    logging.basicConfig(level=logging.WARNING, format="%(message)s", stream=sys.stdout)
+    logger.setLevel(logging.INFO)
     main()
@@ -2,6 +2,7 @@
 Example demonstrating the learning/feedback mechanism
 """
 
+import logging
 import os
 import sys
 
@@ -14,6 +15,8 @@ from src.penta_cs_agent import (
     AgentConfig
 )
 
+logger = logging.getLogger(__name__)
+
 
 def main():
     """Demonstrate the feedback and learning mechanism"""
@@ -22,10 +25,10 @@ def main():
     config = AgentConfig(enable_learning=True)
     agent = EmailClassificationAgent(config=config)
 
-    print("=" * 80)
-    print("Feedback and Learning Example")
-    print("=" * 80)
-    print()
+    logger.info("=" * 80)
+    logger.info("Feedback and Learning Example")
+    logger.info("=" * 80)
+    logger.info("")
 
     # Classify an email
     email = EmailClassification(
@@ -43,13 +46,13 @@ Robert Davis
         sender="r.davis@company.com"
     )
 
-    print("Classifying email...")
+    logger.info("Classifying email...")
     result = agent.classify(email)
 
-    print(f"Original Classification: {result.primary_category.value}")
-    print(f"Confidence: {result.confidence:.2%}")
-    print(f"Reasoning: {result.reasoning}")
-    print()
+    logger.info("Original Classification: %s", result.primary_category.value)
+    logger.info("Confidence: %.2f%%", result.confidence * 100)
+    logger.info("Reasoning: %s", result.reasoning)
+    logger.info("")
 
     # Let's say the agent classified this as BILLING_INQUIRY (correct)
     # but in some case it might have misclassified
@@ -57,9 +60,9 @@ Robert Davis
 
     # Example: Correcting a misclassification
     # Let's simulate that it was actually a complaint, not just a billing inquiry
-    print("Providing feedback...")
-    print("Actual category should be: COMPLAINT (due to billing discrepancy)")
-    print()
+    logger.info("Providing feedback...")
+    logger.info("Actual category should be: COMPLAINT (due to billing discrepancy)")
+    logger.info("")
 
     agent.provide_feedback(
         email=email,
@@ -69,8 +72,8 @@ Robert Davis
         notes="Customer is questioning invoice accuracy - this is a complaint about billing error"
     )
 
-    print("Feedback saved! The agent will learn from this.")
-    print()
+    logger.info("Feedback saved! The agent will learn from this.")
+    logger.info("")
 
     # Now let's classify a similar email to see if the agent has learned
     similar_email = EmailClassification(
@@ -88,24 +91,27 @@ Jane Wilson
         sender="j.wilson@business.com"
     )
 
-    print("Classifying a similar email after feedback...")
+    logger.info("Classifying a similar email after feedback...")
     result2 = agent.classify(similar_email)
 
-    print(f"New Classification: {result2.primary_category.value}")
-    print(f"Confidence: {result2.confidence:.2%}")
-    print(f"Reasoning: {result2.reasoning}")
-    print()
-    print("The agent now has the previous similar case in its knowledge base")
-    print("which may influence future classifications!")
-    print()
+    logger.info("New Classification: %s", result2.primary_category.value)
+    logger.info("Confidence: %.2f%%", result2.confidence * 100)
+    logger.info("Reasoning: %s", result2.reasoning)
+    logger.info("")
+    logger.info("The agent now has the previous similar case in its knowledge base")
+    logger.info("which may influence future classifications!")
+    logger.info("")
 
     # Show statistics
     stats = agent.get_statistics()
-    print("Knowledge Base Statistics:")
-    print(f"- Classification History: {stats['knowledge_base']['total_history']} entries")
-    print(f"- Common Queries: {stats['knowledge_base']['total_queries']} entries")
-    print()
+    logger.info("Knowledge Base Statistics:")
+    logger.info("- Classification History: %s entries", stats['knowledge_base']['total_history'])
+    logger.info("- Common Queries: %s entries", stats['knowledge_base']['total_queries'])
+    logger.info("")
 
 
 if __name__ == "__main__":
+    # Only the example's own output; SDK request logs stay at WARNING
+    logging.basicConfig(level=logging.WARNING, format="%(message)s", stream=sys.stdout)
+    logger.setLevel(logging.INFO)
     main()
@@ -2,27 +2,32 @@
 Example showing how to populate the knowledge base with product and query data
 """
 
+import logging
 import os
 import sys
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from src.penta_cs_agent.config import AgentConfig
 from src.penta_cs_agent.knowledge_base import KnowledgeBase
 
+logger = logging.getLogger(__name__)
+
 
 def main():
     """Demonstrate knowledge base population"""
 
-    print("=" * 80)
-    print("Knowledge Base Setup Example")
-    print("=" * 80)
-    print()
+    logger.info("=" * 80)
+    logger.info("Knowledge Base Setup Example")
+    logger.info("=" * 80)
+    logger.info("")
 
-    # Initialize knowledge base
-    kb = KnowledgeBase(persist_directory="./data/knowledge_base")
+    # Initialize knowledge base at the same path the agent examples use;
+    # entries already stored by a previous run are skipped
+    kb = KnowledgeBase(persist_directory=AgentConfig().knowledge_base_path)
 
-    print("Populating knowledge base with Penta Fine Ingredients data...")
-    print()
+    logger.info("Populating knowledge base with Penta Fine Ingredients data...")
+    logger.info("")
 
     # Add product information
     products = [
@@ -63,95 +68,87 @@ def main():
         },
     ]
 
+    kb.add_products_bulk(products)
     for product in products:
-        kb.add_product(
-            product_id=product["product_id"],
-            name=product["name"],
-            description=product["description"],
-            category=product["category"],
-            metadata=product.get("metadata", {})
-        )
-        print(f"Added product: {product['name']}")
+        logger.info("Added product: %s", product['name'])
 
-    print()
+    logger.info("")
 
     # Add common queries
     common_queries = [
         {
             "query_id": "Q001",
-            "text": "What is the price for bulk citric acid?",
+            "query_text": "What is the price for bulk citric acid?",
             "classification": "quote_request",
             "confidence": 0.95
         },
         {
             "query_id": "Q002",
-            "text": "Do you have the COA and specifications for sodium benzoate?",
+            "query_text": "Do you have the COA and specifications for sodium benzoate?",
             "classification": "regulatory_compliance",
             "confidence": 0.90
         },
         {
             "query_id": "Q003",
-            "text": "Can I get samples of your preservatives to test?",
+            "query_text": "Can I get samples of your preservatives to test?",
             "classification": "sample_request",
             "confidence": 0.98
         },
         {
             "query_id": "Q004",
-            "text": "Where is my order? I haven't received tracking.",
+            "query_text": "Where is my order? I haven't received tracking.",
             "classification": "order_inquiry",
             "confidence": 0.92
         },
         {
             "query_id": "Q005",
-            "text": "What are the differences between your citric acid grades?",
+            "query_text": "What are the differences between your citric acid grades?",
             "classification": "product_inquiry",
             "confidence": 0.88
         },
     ]
 
+    kb.add_common_queries_bulk(common_queries)
     for query in common_queries:
-        kb.add_common_query(
-            query_id=query["query_id"],
-            query_text=query["text"],
-            classification=query["classification"],
-            confidence=query["confidence"]
-        )
-        print(f"Added common query: {query['query_id']}")
+        logger.info("Added common query: %s", query['query_id'])
 
-    print()
+    logger.info("")
 
     # Test search functionality
-    print("Testing knowledge base search...")
-    print()
+    logger.info("Testing knowledge base search...")
+    logger.info("")
 
     # Search for products
-    print("Searching for 'preservative for baked goods':")
+    logger.info("Searching for 'preservative for baked goods':")
     results = kb.search_products("preservative for baked goods", n_results=3)
     for i, result in enumerate(results, 1):
-        print(f"  {i}. {result['metadata']['name']} (relevance: {1 - result['distance']:.2f})")
-    print()
+        logger.info("  %s. %s (relevance: %.2f)", i, result['metadata']['name'], 1 - result['distance'])
+    logger.info("")
 
     # Search for similar queries
-    print("Searching for similar query: 'I need pricing for large order'")
+    logger.info("Searching for similar query: 'I need pricing for large order'")
     results = kb.search_similar_queries("I need pricing for large order", n_results=3)
     for i, result in enumerate(results, 1):
-        print(f"  {i}. Classification: {result['metadata']['classification']}")
-        print(f"     Query: {result['document'][:60]}...")
-        print(f"     Relevance: {1 - result['distance']:.2f}")
-    print()
+        logger.info("  %s. Classification: %s", i, result['metadata']['classification'])
+        logger.info("     Query: %s...", result['document'][:60])
+        logger.info("     Relevance: %.2f", 1 - result['distance'])
+    logger.info("")
 
     # Get statistics
     stats = kb.get_stats()
-    print("Knowledge Base Statistics:")
-    print(f"  Total Products: {stats['total_products']}")
-    print(f"  Total Common Queries: {stats['total_queries']}")
-    print(f"  Total Classification History: {stats['total_history']}")
-    print()
+    logger.info("Knowledge Base Statistics:")
+    logger.info("  Total Products: %s", stats['total_products'])
+    logger.info("  Total Common Queries: %s", stats['total_queries'])
+    logger.info("  Total Classification History: %s", stats['total_history'])
+    logger.info("")
 
-    print("Knowledge base setup complete!")
-    print("The agent will now use this information to make better classifications.")
-    print()
+    logger.info("Knowledge base setup complete!")
+    logger.info("The agent will now use this information to make better classifications.")
+    logger.info("")
 
 
 if __name__ == "__main__":
+    # Only the example's own output; SDK request logs stay at WARNING
+    logging.basicConfig(level=logging.WARNING, format="%(message)s", stream=sys.stdout)
+    logger.setLevel(logging.INFO)
     main()
@@ -2,6 +2,8 @@
 Setup script for Penta CS Email Classification Agent
 """
 
+import os
+
 from setuptools import setup, find_packages
 
 with open("README.md", "r", encoding="utf-8") as fh:
@@ -10,6 +12,23 @@ with open("README.md", "r", encoding="utf-8") as fh:
 with open("requirements.txt", "r", encoding="utf-8") as fh:
     requirements = [line.strip() for line in fh if line.strip() and not line.startswith("#")]
 
+# Opt-in: PENTA_CS_AGENT_MYPYC=1 compiles the tool registry to a C extension
+# with mypyc (needs mypy in the build environment, e.g. pip install
+# --no-build-isolation). The .py source still ships and is used whenever the
+# extension is not built. models.py is left alone: its validation already
+# runs in pydantic-core, and mypyc cannot compile pydantic's metaclass-based
+# models to native classes.
+ext_modules = []
+if os.environ.get("PENTA_CS_AGENT_MYPYC") == "1":
+    from mypyc.build import mypycify
+    ext_modules = mypycify([
+        # Type-check tools.py alone: the package modules it sits beside are
+        # not compiled, and mypyc treats unchecked-annotation notes as errors
+        "--follow-imports=silent",
+        "--check-untyped-defs",
+        "src/penta_cs_agent/tools.py",
+    ])
+
 setup(
     name="penta-cs-agent",
     version="1.0.0",
@@ -36,6 +55,7 @@ setup(
     ],
     python_requires=">=3.9",
     install_requires=requirements,
+    ext_modules=ext_modules,
     extras_require={
         "dev": [
             "pytest>=7.0.0",
@@ -45,6 +65,9 @@ setup(
             "flake8>=6.0.0",
             "mypy>=1.0.0",
         ],
+        "http2": [
+            "h2>=4.0.0",
+        ],
     },
     entry_points={
         "console_scripts": [
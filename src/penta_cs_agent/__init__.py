@@ -2,10 +2,14 @@
 Penta CS Agent - Email Classification Agent for Customer Service Routing
 """
 
-from .agent import EmailClassificationAgent
+from typing import TYPE_CHECKING
+
 from .models import EmailClassification, EmailCategory, ClassificationResult
 from .config import AgentConfig
 
+if TYPE_CHECKING:
+    from .agent import EmailClassificationAgent
+
 __version__ = "1.0.0"
 __all__ = [
     "EmailClassificationAgent",
@@ -14,3 +18,16 @@ __all__ = [
     "ClassificationResult",
     "AgentConfig",
 ]
+
+
+def __getattr__(name: str):
+    # The agent pulls in the LLM SDKs and chromadb, so it is only imported
+    # on first access; the models and config above are plain pydantic
+    if name == "EmailClassificationAgent":
+        from .agent import EmailClassificationAgent
+        return EmailClassificationAgent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + ["EmailClassificationAgent"])
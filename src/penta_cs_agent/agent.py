@@ -2,23 +2,374 @@
 Main email classification agent
 """
 
-import json
+import asyncio
 import hashlib
-from typing import Dict, Any, Optional, List
+import os
+import re
+import sys
+import time
+from functools import cached_property
+from typing import Dict, Any, Optional, List, Tuple, Union, Iterator, Generator
 from datetime import datetime
 
-from anthropic import Anthropic
-from openai import OpenAI
+import anthropic
+import openai
+import orjson
+from anthropic import Anthropic, AsyncAnthropic
+from openai import OpenAI, AsyncOpenAI
+from openai.types.chat import ChatCompletionMessage
+from pydantic import BaseModel, Field, field_validator
 
 from .models import (
     EmailClassification,
     EmailCategory,
     ClassificationResult,
-    FeedbackEntry
+    FeedbackEntry,
+    FEEDBACK_LIST_ADAPTER,
+    PRIORITY_LEVELS
 )
 from .config import AgentConfig
+from . import fast_path, tokens
+from .cache import DiskCache
 from .knowledge_base import KnowledgeBase
-from .tools import ToolRegistry, default_registry
+from . import default_tools
+from .tools import ToolRegistry
+
+
+# Provider clients shared by every agent in the process, keyed by
+# (provider, api key digest, max retries, http2), so repeated agent
+# construction reuses one connection pool instead of opening a new one
+_CLIENT_CACHE: Dict[Tuple[str, str, int, bool], Union[Anthropic, OpenAI]] = {}
+
+# HTTP connection pools shared by all clients of a provider, so keep-alive
+# connections and TLS sessions survive across API keys and agents. Each SDK
+# supplies its own client class, built on the HTTP library it bundles, with
+# generous pool limits (1000 connections, 100 kept alive) by default
+_HTTP_CLIENTS: Dict[Tuple[str, bool], Any] = {}
+
+
+def _get_http_client(provider: str, http2: bool = False) -> Any:
+    """
+    Get (creating on first use) the shared HTTP client for a provider
+
+    Args:
+        provider: "anthropic" or "openai"
+        http2: Negotiate HTTP/2, multiplexing concurrent requests over one
+            connection (requires the h2 package)
+    """
+    client = _HTTP_CLIENTS.get((provider, http2))
+    if client is None or client.is_closed:
+        sdk = anthropic if provider == "anthropic" else openai
+        client = sdk.DefaultHttpxClient(http2=http2)
+        _HTTP_CLIENTS[(provider, http2)] = client
+    return client
+
+
+def _get_shared_client(provider: str, api_key: Optional[str],
+                       max_retries: int = 2, http2: bool = False) -> Union[Anthropic, OpenAI]:
+    """Get (creating on first use) the shared client for a provider, key, retry policy and protocol"""
+    key = (provider, hashlib.sha256((api_key or "").encode()).hexdigest(), max_retries, http2)
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        sdk_client = Anthropic if provider == "anthropic" else OpenAI
+        client = sdk_client(
+            api_key=api_key,
+            max_retries=max_retries,
+            http_client=_get_http_client(provider, http2)
+        )
+        _CLIENT_CACHE[key] = client
+    return client
+
+
+class _ClassificationPayload(BaseModel):
+    """
+    Schema of the JSON the LLM is asked to return
+
+    Validated directly from the response text by pydantic-core, so the
+    reply is parsed and checked in a single native pass. Carries the same
+    constraints as ClassificationResult, which is then built from it
+    without validating again.
+    """
+
+    primary_category: EmailCategory
+    confidence: float = Field(default=0.5, ge=0.0, le=1.0)
+    secondary_categories: List[EmailCategory] = Field(default_factory=list)
+    reasoning: str = ""
+    extracted_entities: Dict[str, Any] = Field(default_factory=dict)
+    recommended_action: str = ""
+    priority: str = "normal"
+
+    @field_validator("priority")
+    @classmethod
+    def _normalize_priority(cls, value: str) -> str:
+        # Map onto the shared interned constant; anything outside the
+        # prompt's four levels falls back to the default
+        value = value.strip().lower()
+        return sys.intern(value) if value in PRIORITY_LEVELS else "normal"
+
+
+# Leading fields of the response JSON, matched against a partially streamed
+# response. The confidence must be followed by a delimiter so that a number
+# still being streamed (e.g. "0.9" of "0.95") is not taken as complete
+_PARTIAL_CATEGORY_RE = re.compile(r'"primary_category"\s*:\s*"([^"]+)"')
+_PARTIAL_CONFIDENCE_RE = re.compile(r'"confidence"\s*:\s*([0-9.]+)\s*[,}\n]')
+
+
+# The response JSON: the object inside a (optionally json-tagged) code
+# fence, else the outermost braces. The fence is searched for on its own
+# first, so braces in prose ahead of it are not taken for the object
+_JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+class _JsonObjectScanner:
+    """
+    Finds the end of the first top-level JSON object in streamed text
+
+    Chunks are scanned once as they arrive, tracking brace depth outside
+    of string literals, so the response can be parsed the moment its
+    object closes instead of after the stream ends. An object may only
+    begin at the start of a line (or of the text) or right after a code
+    fence, so placeholders like {order_id} in prose are not mistaken for
+    the response.
+    """
+
+    # Enough trailing text to recognize a fence opened before the brace
+    _TAIL = 16
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._length = 0
+        self._tail = ""
+        self._line_blank = True
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.end: Optional[int] = None
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Scan the next chunk of text
+
+        Returns:
+            True once the first top-level object is complete
+        """
+        self._parts.append(chunk)
+        self._length += len(chunk)
+        if self.end is not None:
+            return True
+        return self._scan(chunk, self._length - len(chunk))
+
+    def resume(self) -> bool:
+        """
+        Discard the completed object and look for the next one
+
+        Returns:
+            True if another object is already complete in the text received
+        """
+        received = "".join(self._parts)
+        offset = self.end
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._line_blank = False
+        self._tail = received[max(0, offset - self._TAIL):offset]
+        self.end = None
+        return self._scan(received[offset:], offset)
+
+    def _scan(self, text: str, offset: int) -> bool:
+        for index, char in enumerate(text):
+            if self._start is None:
+                if char == "{" and (self._line_blank or self._after_fence(text, index)):
+                    self._start = offset + index
+                    self._depth = 1
+                elif char == "\n":
+                    self._line_blank = True
+                elif not char.isspace():
+                    self._line_blank = False
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = offset + index + 1
+                    return True
+        self._tail = (self._tail + text)[-self._TAIL:]
+        return False
+
+    def _after_fence(self, text: str, index: int) -> bool:
+        return (self._tail + text[:index]).rstrip().endswith(("```json", "```"))
+
+    @property
+    def text(self) -> str:
+        """The complete object, or everything received if it has not closed"""
+        received = "".join(self._parts)
+        if self.end is None:
+            return received
+        return received[self._start:self.end]
+
+
+# User prompt template; only the email fields vary per call, and the
+# response format instructions are appended verbatim
+_CLASSIFICATION_PROMPT = """Please classify this customer service email:
+
+Subject: {subject}
+
+Body:
+{body}
+
+{sender}
+
+"""
+
+_RESPONSE_FORMAT = """Provide your response in the following JSON format:
+{
+    "primary_category": "category_name",
+    "confidence": 0.95,
+    "secondary_categories": ["other_category"],
+    "reasoning": "Detailed explanation of why you chose this classification",
+    "extracted_entities": {
+        "product_names": ["Product A", "Product B"],
+        "order_number": "12345",
+        "quantity": "500 kg",
+        "other_info": "any other relevant extracted information"
+    },
+    "recommended_action": "Route to sales team for quote preparation",
+    "priority": "normal"
+}
+"""
+
+# Feedback entries on a rule's category needed before its accuracy can
+# take it off the fast path
+_MIN_RULE_FEEDBACK = 5
+
+# Knowledge base context lines, filled per matching item
+_SIMILAR_QUERY_LINE = "  - Category: {} (confidence: {:.2f})".format
+_PRODUCT_LINE = "  - {}".format
+
+
+class SemanticCache:
+    """
+    Reuses the classifications of near-duplicate past emails
+
+    Looks for a past result within max_distance (cosine) of the email in
+    the knowledge base: first in the classification history, preferring
+    feedback corrections and otherwise limited to results from the same
+    provider and model and younger than ttl, then among the common
+    queries (which also include feedback corrections).
+    """
+
+    def __init__(self, knowledge_base: KnowledgeBase, namespace: str,
+                 max_distance: float, ttl: Optional[float] = None):
+        """
+        Args:
+            knowledge_base: Knowledge base holding past classifications
+            namespace: Provider/model namespace history entries must match
+            max_distance: Maximum cosine distance for a near-duplicate
+            ttl: Seconds after which history entries are ignored (None = never)
+        """
+        self.knowledge_base = knowledge_base
+        self.namespace = namespace
+        self.max_distance = max_distance
+        self.ttl = ttl
+
+    def lookup_history(self, email_content: str) -> Optional[ClassificationResult]:
+        """
+        Return the stored result of a near-duplicate classified email
+
+        Feedback corrections (history entries marked was_correct) take
+        precedence over stored results, so a corrected email is not served
+        its original classification again.
+
+        Args:
+            email_content: Email content (subject + body)
+
+        Returns:
+            The corrected or past ClassificationResult, or None if there is
+            no close, fresh match from the same namespace
+        """
+        stored: Dict[str, Any] = {"cache_namespace": self.namespace}
+        if self.ttl is not None:
+            stored = {"$and": [stored, {"created_at": {"$gte": time.time() - self.ttl}}]}
+
+        hits = self.knowledge_base.search_classification_history(
+            email_content, n_results=3,
+            where={"$or": [stored, {"was_correct": True}]}
+        )
+        hits = [hit for hit in hits if hit["distance"] < self.max_distance]
+        if not hits:
+            return None
+
+        for hit in hits:
+            if hit["metadata"].get("was_correct") is True:
+                return self._corrected_result(hit)
+
+        result_json = hits[0]["metadata"].get("result_json")
+        if not result_json:
+            return None
+        try:
+            return ClassificationResult.model_validate_json(result_json)
+        except ValueError:
+            # Stored under an older result schema; classify afresh
+            return None
+
+    @staticmethod
+    def _corrected_result(hit: Dict[str, Any]) -> Optional[ClassificationResult]:
+        """Build a result from a feedback correction history entry"""
+        try:
+            category = EmailCategory(hit["metadata"].get("classification"))
+        except ValueError:
+            return None
+
+        # Fields are already typed and in range, so skip validation
+        return ClassificationResult.model_construct(
+            primary_category=category,
+            confidence=1.0,
+            reasoning=f"Matched corrected classification of a past email (distance: {hit['distance']:.3f})",
+            recommended_action=f"Route as {category.value}"
+        )
+
+    def lookup_queries(self, context: Dict[str, Any]) -> Optional[ClassificationResult]:
+        """
+        Build a result from the closest similar query in the context
+
+        Args:
+            context: Context from knowledge base
+
+        Returns:
+            Result derived from the closest similar query if it lies within
+            max_distance, else None
+        """
+        if not context.get("similar_queries"):
+            return None
+
+        best = min(context["similar_queries"], key=lambda item: item["distance"])
+        if best["distance"] >= self.max_distance:
+            return None
+
+        try:
+            category = EmailCategory(best["metadata"].get("classification"))
+        except ValueError:
+            return None
+
+        # Fields are already typed and in range, so skip validation
+        return ClassificationResult.model_construct(
+            primary_category=category,
+            confidence=max(0.0, min(1.0, 1 - best["distance"])),
+            reasoning=f"Matched similar past query (distance: {best['distance']:.3f})",
+            recommended_action=f"Route as {category.value}"
+        )
 
 
 class EmailClassificationAgent:
@@ -28,6 +379,9 @@ class EmailClassificationAgent:
     This agent uses LLMs (Anthropic Claude or OpenAI GPT) to classify incoming
     customer service emails, can call external functions for data lookup,
     learns from feedback, and maintains a knowledge base.
+
+    Prompts place static content (tool definitions, instructions) ahead of
+    per-email content so that repeated calls share a cacheable prefix.
     """
 
     def __init__(
@@ -47,31 +401,64 @@ class EmailClassificationAgent:
         self.config = config or AgentConfig()
         self.config.validate_keys()
 
-        # Initialize LLM client based on provider
-        if self.config.llm_provider == "anthropic":
-            self.anthropic_client = Anthropic(api_key=self.config.anthropic_api_key)
-            self.openai_client = None
-        else:
-            self.openai_client = OpenAI(api_key=self.config.openai_api_key)
-            self.anthropic_client = None
-
         # Initialize tool registry and knowledge base
-        self.tool_registry = tool_registry or default_registry
+        self.tool_registry = tool_registry or default_tools.default_registry
         self.knowledge_base = knowledge_base or KnowledgeBase(
-            persist_directory=self.config.knowledge_base_path
+            persist_directory=self.config.knowledge_base_path,
+            history_flush_size=self.config.history_flush_size
         )
 
-    def _get_system_prompt(self, context: Optional[Dict[str, Any]] = None) -> str:
-        """
-        Generate the system prompt for the LLM
+        # The instructions and categories never change at runtime
+        self._static_system_prompt = self._build_static_system_prompt()
 
-        Args:
-            context: Additional context from knowledge base
+        # Per rule category, [feedback count, count confirming the rule],
+        # loaded from the feedback log on first fast path use
+        self._rule_feedback: Optional[Dict[EmailCategory, List[int]]] = None
 
-        Returns:
-            System prompt string
-        """
-        base_prompt = f"""You are an expert email classification agent for Penta Fine Ingredients, a company specializing in fine chemical ingredients.
+        # Persistent response cache (optional)
+        self.response_cache = (
+            DiskCache(self.config.cache_dir, ttl=self.config.cache_ttl)
+            if self.config.cache_dir else None
+        )
+
+        # Near-duplicate lookup in the knowledge base (optional)
+        self.semantic_cache = (
+            SemanticCache(
+                self.knowledge_base,
+                namespace=self._cache_namespace(),
+                max_distance=self.config.semantic_cache_threshold,
+                ttl=self.config.cache_ttl
+            )
+            if self.config.enable_semantic_cache else None
+        )
+
+        # Async client is created lazily per event loop
+        self._async_client = None
+        self._async_client_loop = None
+
+    @cached_property
+    def anthropic_client(self) -> Optional[Anthropic]:
+        """Anthropic client, created on first use (None for other providers)"""
+        if self.config.llm_provider != "anthropic":
+            return None
+        return _get_shared_client("anthropic", self.config.anthropic_api_key,
+                                  self.config.max_retries, self.config.http2)
+
+    @cached_property
+    def openai_client(self) -> Optional[OpenAI]:
+        """OpenAI client, created on first use (None for other providers)"""
+        if self.config.llm_provider != "openai":
+            return None
+        return _get_shared_client("openai", self.config.openai_api_key,
+                                  self.config.max_retries, self.config.http2)
+
+    def _get_static_system_prompt(self) -> str:
+        """Get the part of the system prompt that is identical for every email"""
+        return self._static_system_prompt
+
+    def _build_static_system_prompt(self) -> str:
+        """Build the static system prompt (instructions and category list)"""
+        return f"""You are an expert email classification agent for Penta Fine Ingredients, a company specializing in fine chemical ingredients.
 
 Your job is to classify incoming customer service emails into one of the following categories:
 
@@ -95,14 +482,62 @@ Consider:
 Be thorough in your analysis and provide clear reasoning for your classification.
 """
 
+    def _get_context_prompt(self, context: Optional[Dict[str, Any]]) -> str:
+        """Get the per-email knowledge base section of the system prompt"""
+        if not context:
+            return ""
+        context_text = self._format_context(context)
+        return f"Relevant Context:\n{context_text}" if context_text else ""
+
+    def _get_system_prompt(self, context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate the system prompt for the LLM
+
+        The static instructions come first and the knowledge base context
+        last, so the prompt shares a stable prefix across emails that
+        providers can serve from their prompt cache.
+
+        Args:
+            context: Additional context from knowledge base
+
+        Returns:
+            System prompt string
+        """
+        base_prompt = self._get_static_system_prompt()
+
         # Add context from knowledge base if available
-        if context:
-            context_text = self._format_context(context)
-            if context_text:
-                base_prompt += f"\n\nRelevant Context:\n{context_text}"
+        context_prompt = self._get_context_prompt(context)
+        if context_prompt:
+            base_prompt += f"\n\n{context_prompt}"
 
         return base_prompt
 
+    def _get_anthropic_system(self, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Generate the Anthropic system blocks with a prompt-cache breakpoint
+
+        The cache_control marker on the static block lets Anthropic cache
+        the tool definitions and instructions that precede it; only the
+        trailing context block and the user message vary per email.
+
+        Args:
+            context: Additional context from knowledge base
+
+        Returns:
+            List of system content blocks
+        """
+        blocks = [{
+            "type": "text",
+            "text": self._get_static_system_prompt(),
+            "cache_control": {"type": "ephemeral"}
+        }]
+
+        context_prompt = self._get_context_prompt(context)
+        if context_prompt:
+            blocks.append({"type": "text", "text": context_prompt})
+
+        return blocks
+
     def _get_categories_description(self) -> str:
         """Get formatted description of all categories"""
         descriptions = []
@@ -115,47 +550,139 @@ Be thorough in your analysis and provide clear reasoning for your classification
         """Format context from knowledge base for the prompt"""
         parts = []
 
-        if context.get("similar_queries"):
+        queries = context.get("similar_queries")
+        if queries:
             parts.append("Similar past queries:")
-            for item in context["similar_queries"][:2]:
-                meta = item.get("metadata", {})
-                parts.append(f"  - Category: {meta.get('classification')} (confidence: {meta.get('confidence', 0):.2f})")
+            parts.extend(
+                _SIMILAR_QUERY_LINE(meta.get("classification"), meta.get("confidence", 0))
+                for meta in (item.get("metadata", {}) for item in queries[:2])
+            )
 
-        if context.get("relevant_products"):
+        products = context.get("relevant_products")
+        if products:
             parts.append("\nRelevant products:")
-            for item in context["relevant_products"][:3]:
-                meta = item.get("metadata", {})
-                parts.append(f"  - {meta.get('name')}")
+            parts.extend(_PRODUCT_LINE(item.get("metadata", {}).get("name")) for item in products[:3])
 
-        return "\n".join(parts) if parts else ""
+        return "\n".join(parts)
 
     def _create_classification_prompt(self, email: EmailClassification) -> str:
         """Create the user prompt for classification"""
-        return f"""Please classify this customer service email:
+        body = email.body
+        if self.config.max_body_tokens is not None:
+            body = tokens.truncate_to_tokens(body, self.config.max_body_tokens)
 
-Subject: {email.subject}
+        return _CLASSIFICATION_PROMPT.format_map({
+            "subject": email.subject,
+            "body": body,
+            "sender": f"Sender: {email.sender}" if email.sender else ""
+        }) + _RESPONSE_FORMAT
 
-Body:
-{email.body}
+    def _anthropic_request(
+        self,
+        system: List[Dict[str, Any]],
+        messages: List[Dict[str, Any]],
+        tools: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build keyword arguments for an Anthropic messages.create call"""
+        request = {
+            "model": self.config.anthropic_model,
+            "max_tokens": self.config.max_tokens,
+            "temperature": self.config.temperature,
+            "system": system,
+            "messages": messages
+        }
+        if tools:
+            request["tools"] = tools
+        return request
+
+    @staticmethod
+    def _anthropic_tool_blocks(response: Any) -> List[Any]:
+        """The tool_use blocks of an Anthropic response, if it stopped to call tools"""
+        if response.stop_reason != "tool_use":
+            return []
+        return [block for block in response.content if block.type == "tool_use"]
+
+    @staticmethod
+    def _anthropic_follow_up(
+        user_prompt: str,
+        response: Any,
+        tool_blocks: List[Any],
+        results: List[Any]
+    ) -> List[Dict[str, Any]]:
+        """Follow-up messages carrying the results of the tool_blocks calls"""
+        tool_results = [
+            {"tool": block.name, "result": result}
+            for block, result in zip(tool_blocks, results)
+        ]
+
+        return [
+            {"role": "user", "content": user_prompt},
+            {"role": "assistant", "content": response.content},
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": block.id,
+                        "content": orjson.dumps(tool_results).decode()
+                    }
+                    for block in tool_blocks
+                ]
+            }
+        ]
 
-{f"Sender: {email.sender}" if email.sender else ""}
+    def _run_anthropic_tools(
+        self,
+        user_prompt: str,
+        response: Any
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Execute the tool calls requested in an Anthropic response
 
-Provide your response in the following JSON format:
-{{
-    "primary_category": "category_name",
-    "confidence": 0.95,
-    "secondary_categories": ["other_category"],
-    "reasoning": "Detailed explanation of why you chose this classification",
-    "extracted_entities": {{
-        "product_names": ["Product A", "Product B"],
-        "order_number": "12345",
-        "quantity": "500 kg",
-        "other_info": "any other relevant extracted information"
-    }},
-    "recommended_action": "Route to sales team for quote preparation",
-    "priority": "normal"
-}}
-"""
+        Args:
+            user_prompt: The original user prompt
+            response: Anthropic message response
+
+        Returns:
+            Follow-up messages carrying the tool results, or None if no
+            tools were called
+        """
+        tool_blocks = self._anthropic_tool_blocks(response)
+        if not tool_blocks:
+            return None
+
+        results = [self.tool_registry.call_tool(block.name, block.input) for block in tool_blocks]
+        return self._anthropic_follow_up(user_prompt, response, tool_blocks, results)
+
+    async def _arun_anthropic_tools(
+        self,
+        user_prompt: str,
+        response: Any
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Async counterpart of _run_anthropic_tools"""
+        tool_blocks = self._anthropic_tool_blocks(response)
+        if not tool_blocks:
+            return None
+
+        results = await self._acall_tools([(block.name, block.input) for block in tool_blocks])
+        return self._anthropic_follow_up(user_prompt, response, tool_blocks, results)
+
+    async def _acall_tools(self, calls: List[Tuple[str, Any]]) -> List[Any]:
+        """
+        Run (name, arguments) tool calls off the event loop
+
+        Tools are plain synchronous functions that may block on I/O, so
+        each call runs in a worker thread; results come back in call order.
+        """
+        return await asyncio.gather(*(
+            asyncio.to_thread(self.tool_registry.call_tool, name, arguments)
+            for name, arguments in calls
+        ))
+
+    @staticmethod
+    def _anthropic_text(response: Any) -> str:
+        """Concatenate the text blocks of an Anthropic response"""
+        return "".join(block.text for block in response.content if block.type == "text")
 
     def classify_with_anthropic(
         self,
@@ -172,7 +699,7 @@ Provide your response in the following JSON format:
         Returns:
             Classification result
         """
-        system_prompt = self._get_system_prompt(context)
+        system_prompt = self._get_anthropic_system(context)
         user_prompt = self._create_classification_prompt(email)
 
         # Get tool definitions if available
@@ -180,61 +707,126 @@ Provide your response in the following JSON format:
 
         # Call Anthropic API
         response = self.anthropic_client.messages.create(
-            model=self.config.anthropic_model,
-            max_tokens=self.config.max_tokens,
-            temperature=self.config.temperature,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}],
-            tools=tools if tools else None
+            **self._anthropic_request(
+                system_prompt, [{"role": "user", "content": user_prompt}], tools
+            )
         )
 
-        # Handle tool calls if present
-        tool_results = []
-        if response.stop_reason == "tool_use":
-            for block in response.content:
-                if block.type == "tool_use":
-                    tool_result = self.tool_registry.call_tool(
-                        block.name,
-                        block.input
-                    )
-                    tool_results.append({
-                        "tool": block.name,
-                        "result": tool_result
-                    })
-
-            # If tools were called, get final response
-            if tool_results:
-                messages = [
-                    {"role": "user", "content": user_prompt},
-                    {"role": "assistant", "content": response.content},
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": block.id,
-                                "content": json.dumps(tool_results)
-                            }
-                            for block in response.content if block.type == "tool_use"
-                        ]
-                    }
-                ]
-                response = self.anthropic_client.messages.create(
-                    model=self.config.anthropic_model,
-                    max_tokens=self.config.max_tokens,
-                    temperature=self.config.temperature,
-                    system=system_prompt,
-                    messages=messages,
-                    tools=tools
-                )
+        # If tools were called, get final response
+        follow_up = self._run_anthropic_tools(user_prompt, response)
+        if follow_up:
+            response = self.anthropic_client.messages.create(
+                **self._anthropic_request(system_prompt, follow_up, tools)
+            )
 
-        # Extract text response
-        text_content = ""
-        for block in response.content:
-            if block.type == "text":
-                text_content += block.text
+        return self._parse_classification_response(self._anthropic_text(response), email)
 
-        return self._parse_classification_response(text_content, email)
+    async def _aclassify_with_anthropic(
+        self,
+        email: EmailClassification,
+        context: Optional[Dict[str, Any]],
+        client: AsyncAnthropic
+    ) -> ClassificationResult:
+        """Async counterpart of classify_with_anthropic"""
+        system_prompt = self._get_anthropic_system(context)
+        user_prompt = self._create_classification_prompt(email)
+        tools = self.tool_registry.get_tool_definitions_for_anthropic()
+
+        response = await client.messages.create(
+            **self._anthropic_request(
+                system_prompt, [{"role": "user", "content": user_prompt}], tools
+            )
+        )
+
+        follow_up = await self._arun_anthropic_tools(user_prompt, response)
+        if follow_up:
+            response = await client.messages.create(
+                **self._anthropic_request(system_prompt, follow_up, tools)
+            )
+
+        return self._parse_classification_response(self._anthropic_text(response), email)
+
+    def _openai_request(
+        self,
+        messages: List[Any],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Build keyword arguments for an OpenAI chat.completions.create call"""
+        request = {
+            "model": self.config.openai_model,
+            "messages": messages,
+            "temperature": self.config.temperature,
+            "max_tokens": self.config.max_tokens
+        }
+        if tools:
+            request["tools"] = tools
+        return request
+
+    @staticmethod
+    def _openai_tool_calls(message: Any) -> List[Tuple[str, Any]]:
+        """The (name, decoded arguments) tool calls of an OpenAI response message"""
+        return [
+            (tool_call.function.name, orjson.loads(tool_call.function.arguments))
+            for tool_call in message.tool_calls or ()
+        ]
+
+    @staticmethod
+    def _openai_follow_up(
+        messages: List[Any],
+        message: Any,
+        calls: List[Tuple[str, Any]],
+        results: List[Any]
+    ) -> List[Any]:
+        """messages extended with message and the results of its tool calls"""
+        tool_results = [
+            {"tool": name, "result": result}
+            for (name, _), result in zip(calls, results)
+        ]
+
+        return messages + [
+            message,
+            {
+                "role": "tool",
+                "content": orjson.dumps(tool_results).decode(),
+                "tool_call_id": message.tool_calls[0].id
+            }
+        ]
+
+    def _run_openai_tools(
+        self,
+        messages: List[Any],
+        message: Any
+    ) -> Optional[List[Any]]:
+        """
+        Execute the tool calls requested in an OpenAI response message
+
+        Args:
+            messages: Messages sent in the original request
+            message: Assistant message from the response
+
+        Returns:
+            Messages extended with the tool results, or None if no tools
+            were called
+        """
+        calls = self._openai_tool_calls(message)
+        if not calls:
+            return None
+
+        results = [self.tool_registry.call_tool(name, arguments) for name, arguments in calls]
+        return self._openai_follow_up(messages, message, calls, results)
+
+    async def _arun_openai_tools(
+        self,
+        messages: List[Any],
+        message: Any
+    ) -> Optional[List[Any]]:
+        """Async counterpart of _run_openai_tools"""
+        calls = self._openai_tool_calls(message)
+        if not calls:
+            return None
+
+        results = await self._acall_tools(calls)
+        return self._openai_follow_up(messages, message, calls, results)
 
     def classify_with_openai(
         self,
@@ -264,46 +856,173 @@ Provide your response in the following JSON format:
         ]
 
         response = self.openai_client.chat.completions.create(
-            model=self.config.openai_model,
-            messages=messages,
-            temperature=self.config.temperature,
-            max_tokens=self.config.max_tokens,
-            tools=tools if tools else None
+            **self._openai_request(messages, tools)
         )
 
-        # Handle tool calls if present
-        message = response.choices[0].message
-        if message.tool_calls:
-            tool_results = []
-            for tool_call in message.tool_calls:
-                arguments = json.loads(tool_call.function.arguments)
-                tool_result = self.tool_registry.call_tool(
-                    tool_call.function.name,
-                    arguments
-                )
-                tool_results.append({
-                    "tool": tool_call.function.name,
-                    "result": tool_result
-                })
-
-            # Add tool results to messages and get final response
-            messages.append(message)
-            messages.append({
-                "role": "tool",
-                "content": json.dumps(tool_results),
-                "tool_call_id": message.tool_calls[0].id
-            })
-
+        # Add tool results to messages and get final response
+        follow_up = self._run_openai_tools(messages, response.choices[0].message)
+        if follow_up:
             response = self.openai_client.chat.completions.create(
-                model=self.config.openai_model,
-                messages=messages,
-                temperature=self.config.temperature,
-                max_tokens=self.config.max_tokens
+                **self._openai_request(follow_up)
             )
 
         text_content = response.choices[0].message.content
         return self._parse_classification_response(text_content, email)
 
+    async def _aclassify_with_openai(
+        self,
+        email: EmailClassification,
+        context: Optional[Dict[str, Any]],
+        client: AsyncOpenAI
+    ) -> ClassificationResult:
+        """Async counterpart of classify_with_openai"""
+        system_prompt = self._get_system_prompt(context)
+        user_prompt = self._create_classification_prompt(email)
+        tools = self.tool_registry.get_tool_definitions_for_openai()
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+        response = await client.chat.completions.create(**self._openai_request(messages, tools))
+
+        follow_up = await self._arun_openai_tools(messages, response.choices[0].message)
+        if follow_up:
+            response = await client.chat.completions.create(**self._openai_request(follow_up))
+
+        text_content = response.choices[0].message.content
+        return self._parse_classification_response(text_content, email)
+
+    def _stream_anthropic(
+        self,
+        email: EmailClassification,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Generator[str, None, str]:
+        """
+        Stream an Anthropic classification, running tools between rounds
+
+        Yields:
+            Text deltas as they arrive
+
+        Returns:
+            Full text of the final response
+        """
+        system_prompt = self._get_anthropic_system(context)
+        user_prompt = self._create_classification_prompt(email)
+        tools = self.tool_registry.get_tool_definitions_for_anthropic()
+
+        with self.anthropic_client.messages.stream(
+            **self._anthropic_request(
+                system_prompt, [{"role": "user", "content": user_prompt}], tools
+            )
+        ) as stream:
+            yield from stream.text_stream
+            response = stream.get_final_message()
+
+        # If tools were called, stream the final response
+        follow_up = self._run_anthropic_tools(user_prompt, response)
+        if follow_up:
+            with self.anthropic_client.messages.stream(
+                **self._anthropic_request(system_prompt, follow_up, tools)
+            ) as stream:
+                yield from stream.text_stream
+                response = stream.get_final_message()
+
+        return self._anthropic_text(response)
+
+    def _stream_openai(
+        self,
+        email: EmailClassification,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Generator[str, None, str]:
+        """
+        Stream an OpenAI classification, running tools between rounds
+
+        Yields:
+            Content deltas as they arrive
+
+        Returns:
+            Full content of the final response
+        """
+        system_prompt = self._get_system_prompt(context)
+        user_prompt = self._create_classification_prompt(email)
+        tools = self.tool_registry.get_tool_definitions_for_openai()
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+        content = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        for chunk in self.openai_client.chat.completions.create(
+            **self._openai_request(messages, tools), stream=True
+        ):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content.append(delta.content)
+                yield delta.content
+            # Tool call arguments arrive in fragments keyed by index
+            for call in delta.tool_calls or []:
+                entry = tool_calls.setdefault(call.index, {
+                    "id": None,
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""}
+                })
+                if call.id:
+                    entry["id"] = call.id
+                if call.function and call.function.name:
+                    entry["function"]["name"] += call.function.name
+                if call.function and call.function.arguments:
+                    entry["function"]["arguments"] += call.function.arguments
+
+        message = ChatCompletionMessage.model_validate({
+            "role": "assistant",
+            "content": "".join(content) or None,
+            "tool_calls": [tool_calls[index] for index in sorted(tool_calls)] or None
+        })
+        follow_up = self._run_openai_tools(messages, message)
+        if not follow_up:
+            return message.content or ""
+
+        content = []
+        for chunk in self.openai_client.chat.completions.create(
+            **self._openai_request(follow_up), stream=True
+        ):
+            if chunk.choices and chunk.choices[0].delta.content:
+                content.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+        return "".join(content)
+
+    @staticmethod
+    def _parse_partial_classification(response_text: str) -> Optional[ClassificationResult]:
+        """
+        Build a provisional result from a partially streamed response
+
+        Args:
+            response_text: Response text received so far
+
+        Returns:
+            ClassificationResult carrying only the primary category and
+            confidence, or None until both fields are complete and valid
+        """
+        category_match = _PARTIAL_CATEGORY_RE.search(response_text)
+        confidence_match = _PARTIAL_CONFIDENCE_RE.search(response_text)
+        if not category_match or not confidence_match:
+            return None
+
+        try:
+            return ClassificationResult(
+                primary_category=EmailCategory(category_match.group(1)),
+                confidence=float(confidence_match.group(1)),
+                reasoning="",
+                recommended_action=""
+            )
+        except ValueError:
+            return None
+
     def _parse_classification_response(
         self,
         response_text: str,
@@ -321,39 +1040,33 @@ Provide your response in the following JSON format:
         """
         try:
             # Try to extract JSON from response
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-
-            data = json.loads(response_text)
-
-            # Parse the response
-            primary_category = EmailCategory(data["primary_category"])
-            confidence = float(data.get("confidence", 0.5))
-            secondary_categories = [
-                EmailCategory(cat) for cat in data.get("secondary_categories", [])
-            ]
-
-            result = ClassificationResult(
-                primary_category=primary_category,
-                confidence=confidence,
-                secondary_categories=secondary_categories,
-                reasoning=data.get("reasoning", ""),
-                extracted_entities=data.get("extracted_entities", {}),
-                recommended_action=data.get("recommended_action", ""),
-                priority=data.get("priority", "normal")
+            match = _JSON_FENCE_RE.search(response_text)
+            if match:
+                response_text = match.group(1)
+            else:
+                match = _JSON_OBJECT_RE.search(response_text)
+                if match:
+                    response_text = match.group(0)
+
+            payload = _ClassificationPayload.model_validate_json(response_text)
+
+            # The payload was just validated against the same constraints
+            result = ClassificationResult.model_construct(
+                primary_category=payload.primary_category,
+                confidence=payload.confidence,
+                secondary_categories=payload.secondary_categories,
+                reasoning=payload.reasoning,
+                extracted_entities=payload.extracted_entities,
+                recommended_action=payload.recommended_action,
+                priority=payload.priority
             )
 
             return result
 
         except Exception as e:
-            # Fallback to general inquiry if parsing fails
-            return ClassificationResult(
+            # Fallback to general inquiry if parsing fails; flagged so the
+            # result is never cached and a retry can classify the email
+            fallback = ClassificationResult.model_construct(
                 primary_category=EmailCategory.GENERAL_INQUIRY,
                 confidence=0.3,
                 secondary_categories=[],
@@ -362,44 +1075,515 @@ Provide your response in the following JSON format:
                 recommended_action="Manual review required",
                 priority="normal"
             )
+            fallback._parse_failed = True
+            return fallback
+
+    def _get_cached_result(self, email: EmailClassification) -> Optional[ClassificationResult]:
+        """Return a previously stored result for an unchanged email, if any"""
+        if self.response_cache is None:
+            return None
+
+        key = self._generate_cache_key(email)
+        cached = self.response_cache.get(key)
+        if cached is None:
+            return None
+        try:
+            return ClassificationResult.model_validate_json(cached)
+        except ValueError:
+            # Corrupt or stored under an older result schema; classify afresh
+            self.response_cache.delete(key)
+            return None
 
-    def classify(self, email: EmailClassification) -> ClassificationResult:
+    def _try_fast_path(self, email: EmailClassification) -> Optional[ClassificationResult]:
         """
-        Classify an email using the configured LLM provider
+        Return a rule-based result if the fast path is enabled and confident
 
-        Args:
-            email: Email to classify
+        A rule category whose feedback shows it is right less often than
+        fast_path_min_accuracy goes through the full pipeline instead.
+        """
+        if not self.config.enable_fast_path:
+            return None
 
-        Returns:
-            Classification result
+        result = fast_path.try_classify(email)
+        if result is None or result.confidence < self.config.fast_path_threshold:
+            return None
+
+        total, confirmed = self._get_rule_feedback().get(result.primary_category, (0, 0))
+        if total >= _MIN_RULE_FEEDBACK and confirmed / total < self.config.fast_path_min_accuracy:
+            return None
+        return result
+
+    def _get_rule_feedback(self) -> Dict[EmailCategory, List[int]]:
+        """Get the per-rule feedback tallies, reading the feedback log once"""
+        if self._rule_feedback is None:
+            tallies: Dict[EmailCategory, List[int]] = {}
+            for entry in self.read_feedback():
+                self._tally_rule_feedback(
+                    tallies,
+                    EmailClassification(subject="", body=entry.email_content),
+                    entry.correct_classification
+                )
+            self._rule_feedback = tallies
+        return self._rule_feedback
+
+    @staticmethod
+    def _tally_rule_feedback(tallies: Dict[EmailCategory, List[int]],
+                             email: EmailClassification,
+                             correct_classification: EmailCategory):
+        """Count feedback against the rule that matches the email, if any"""
+        match = fast_path.try_classify(email)
+        if match is None:
+            return
+        tally = tallies.setdefault(match.primary_category, [0, 0])
+        tally[0] += 1
+        if correct_classification == match.primary_category:
+            tally[1] += 1
+
+    def _try_history_cache(self, email_content: str) -> Optional[ClassificationResult]:
+        """Return the result of a near-duplicate past email, if semantic caching is on"""
+        if self.semantic_cache is None:
+            return None
+        return self.semantic_cache.lookup_history(email_content)
+
+    def _try_query_cache(self, context: Dict[str, Any]) -> Optional[ClassificationResult]:
+        """Return the classification of a near-duplicate common query, if semantic caching is on"""
+        if self.semantic_cache is None:
+            return None
+        return self.semantic_cache.lookup_queries(context)
+
+    def _record_result(self, email: EmailClassification, result: ClassificationResult):
         """
-        # Get context from knowledge base
-        email_content = f"{email.subject} {email.body}"
-        context = self.knowledge_base.get_context_for_classification(email_content)
+        Store a fresh classification in the response cache and history
 
-        # Classify using appropriate provider
-        if self.config.llm_provider == "anthropic":
-            result = self.classify_with_anthropic(email, context)
-        else:
-            result = self.classify_with_openai(email, context)
+        A parse-failure fallback is recorded in history without its result
+        and not cached, so one bad reply is not served again for exact or
+        near-duplicate emails.
+        """
+        failed = result._parse_failed
+        if self.response_cache is not None and not failed:
+            self.response_cache.set(self._generate_cache_key(email), result.model_dump_json())
 
         # Store in history if learning is enabled
         if self.config.enable_learning:
             email_id = self._generate_email_id(email)
             self.knowledge_base.add_classification_history(
                 email_id=email_id,
-                email_content=email_content,
+                email_content=f"{email.subject} {email.body}",
                 classification=result.primary_category.value,
                 confidence=result.confidence,
                 metadata={
                     "subject": email.subject,
                     "sender": email.sender,
-                    "extracted_entities": result.extracted_entities
+                    "extracted_entities": result.extracted_entities,
+                    "cache_namespace": self._cache_namespace(),
+                    "result_json": None if failed else result.model_dump_json()
                 }
             )
 
+    def _prepare(
+        self,
+        email: EmailClassification
+    ) -> Tuple[Optional[ClassificationResult], Optional[Dict[str, Any]]]:
+        """
+        Run the steps that precede the LLM call
+
+        Args:
+            email: Email to classify
+
+        Returns:
+            (result, None) if the email was resolved without the LLM by the
+            response cache, fast path or semantic cache, otherwise
+            (None, knowledge base context for the prompt)
+        """
+        cached = self._get_cached_result(email)
+        if cached is not None:
+            return cached, None
+
+        # Skip the LLM entirely for unambiguous emails
+        rule_result = self._try_fast_path(email)
+        if rule_result is not None:
+            return rule_result, None
+
+        # Near-duplicates of past emails reuse their classification
+        email_content = f"{email.subject} {email.body}"
+        semantic_result = self._try_history_cache(email_content)
+        if semantic_result is not None:
+            return semantic_result, None
+
+        # Get context from knowledge base
+        context = self.knowledge_base.get_context_for_classification(email_content)
+
+        semantic_result = self._try_query_cache(context)
+        if semantic_result is not None:
+            return semantic_result, None
+
+        return None, context
+
+    def classify(self, email: EmailClassification) -> ClassificationResult:
+        """
+        Classify an email using the configured LLM provider
+
+        Args:
+            email: Email to classify
+
+        Returns:
+            Classification result
+        """
+        result, context = self._prepare(email)
+        if result is not None:
+            return result
+
+        # Classify using appropriate provider
+        if self.config.llm_provider == "anthropic":
+            result = self.classify_with_anthropic(email, context)
+        else:
+            result = self.classify_with_openai(email, context)
+
+        self._record_result(email, result)
+        return result
+
+    def classify_stream(self, email: EmailClassification) -> Iterator[ClassificationResult]:
+        """
+        Classify an email, streaming the LLM response
+
+        As soon as the primary category and confidence have been streamed,
+        a provisional result carrying only those two fields is yielded so
+        routing can begin while the rest of the response is generated.
+        The stream is closed as soon as the response JSON object is
+        complete, and the complete result is always yielded last.
+
+        Args:
+            email: Email to classify
+
+        Yields:
+            Zero or one provisional result, then the final result
+        """
+        result, context = self._prepare(email)
+        if result is not None:
+            yield result
+            return
+
+        if self.config.llm_provider == "anthropic":
+            stream = self._stream_anthropic(email, context)
+        else:
+            stream = self._stream_openai(email, context)
+
+        scanner = _JsonObjectScanner()
+        received = ""
+        provisional = None
+        while True:
+            try:
+                delta = next(stream)
+            except StopIteration as done:
+                response_text = done.value
+                break
+            received += delta
+            complete = scanner.feed(delta)
+            while complete and not self._is_classification_json(scanner.text):
+                # Some other object (e.g. a quoted example); keep reading
+                complete = scanner.resume()
+            if complete:
+                # Nothing after the object is parsed, so stop generating
+                stream.close()
+                response_text = scanner.text
+                break
+            if provisional is None:
+                provisional = self._parse_partial_classification(received)
+                if provisional is not None:
+                    yield provisional
+
+        result = self._parse_classification_response(response_text, email)
+        self._record_result(email, result)
+        yield result
+
+    @staticmethod
+    def _is_classification_json(text: str) -> bool:
+        """Whether text is a response object the classification parser accepts"""
+        try:
+            _ClassificationPayload.model_validate_json(text)
+        except ValueError:
+            return False
+        return True
+
+    def _create_async_client(self) -> Union[AsyncAnthropic, AsyncOpenAI]:
+        """Create an async client for the configured LLM provider"""
+        if self.config.llm_provider == "anthropic":
+            return AsyncAnthropic(api_key=self.config.anthropic_api_key,
+                                  max_retries=self.config.max_retries,
+                                  http_client=anthropic.DefaultAsyncHttpxClient(http2=self.config.http2))
+        return AsyncOpenAI(api_key=self.config.openai_api_key,
+                           max_retries=self.config.max_retries,
+                           http_client=openai.DefaultAsyncHttpxClient(http2=self.config.http2))
+
+    def _get_async_client(self) -> Union[AsyncAnthropic, AsyncOpenAI]:
+        """Get the async client bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = self._create_async_client()
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def _aclassify(
+        self,
+        email: EmailClassification,
+        client: Union[AsyncAnthropic, AsyncOpenAI]
+    ) -> ClassificationResult:
+        """Classify an email with the given async client"""
+        # Knowledge base and cache access is blocking, so it runs in a
+        # worker thread to keep other requests on the event loop moving
+        result, context = await asyncio.to_thread(self._prepare, email)
+        if result is not None:
+            return result
+
+        if self.config.llm_provider == "anthropic":
+            result = await self._aclassify_with_anthropic(email, context, client)
+        else:
+            result = await self._aclassify_with_openai(email, context, client)
+
+        await asyncio.to_thread(self._record_result, email, result)
         return result
 
+    async def aclassify(self, email: EmailClassification) -> ClassificationResult:
+        """
+        Classify an email asynchronously using the configured LLM provider
+
+        Args:
+            email: Email to classify
+
+        Returns:
+            Classification result
+        """
+        return await self._aclassify(email, self._get_async_client())
+
+    async def aclassify_many(
+        self,
+        emails: List[EmailClassification]
+    ) -> List[Union[ClassificationResult, BaseException]]:
+        """
+        Classify several emails concurrently from a running event loop
+
+        At most config.max_concurrency requests are in flight at once.
+        Rate-limit and server errors are retried with exponential backoff
+        by the SDK client, up to config.max_retries times.
+
+        Args:
+            emails: Emails to classify
+
+        Returns:
+            Results in the same order as emails. A failed classification is
+            returned as the raised exception instead of aborting the batch.
+        """
+        semaphore = asyncio.Semaphore(self.config.max_concurrency)
+
+        async with self._create_async_client() as client:
+            async def run(email: EmailClassification) -> ClassificationResult:
+                async with semaphore:
+                    return await self._aclassify(email, client)
+
+            return await asyncio.gather(
+                *(run(email) for email in emails),
+                return_exceptions=True
+            )
+
+    def classify_many(
+        self,
+        emails: List[EmailClassification]
+    ) -> List[Union[ClassificationResult, BaseException]]:
+        """
+        Classify several emails concurrently
+
+        Requests are dispatched in parallel over an async client, with at
+        most config.max_concurrency in flight, so total latency is close to
+        that of the slowest single call. With config.batch_mode enabled the
+        emails go through classify_batch instead.
+
+        Args:
+            emails: Emails to classify
+
+        Returns:
+            Results in the same order as emails. A failed classification is
+            returned as the raised exception instead of aborting the batch.
+        """
+        if self.config.batch_mode:
+            return self.classify_batch(emails)
+        return asyncio.run(self.aclassify_many(emails))
+
+    def _run_anthropic_batch(
+        self,
+        pending: Dict[str, Tuple[EmailClassification, Dict[str, Any]]]
+    ) -> Dict[str, Union[str, BaseException, None]]:
+        """
+        Classify emails through the Anthropic Message Batches API
+
+        Args:
+            pending: Emails and their context, keyed by batch custom_id
+
+        Returns:
+            Outcome per custom_id: the response text, None if the model
+            asked for a tool call, or the error
+        """
+        tools = self.tool_registry.get_tool_definitions_for_anthropic()
+        requests = [
+            {
+                "custom_id": custom_id,
+                "params": self._anthropic_request(
+                    self._get_anthropic_system(context),
+                    [{"role": "user", "content": self._create_classification_prompt(email)}],
+                    tools
+                )
+            }
+            for custom_id, (email, context) in pending.items()
+        ]
+
+        batches = self.anthropic_client.messages.batches
+        batch = batches.create(requests=requests)
+        while batch.processing_status != "ended":
+            time.sleep(self.config.batch_poll_interval)
+            batch = batches.retrieve(batch.id)
+
+        outcomes: Dict[str, Union[str, BaseException, None]] = {}
+        for entry in batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                error = getattr(entry.result, "error", None)
+                outcomes[entry.custom_id] = RuntimeError(
+                    f"Batch request {entry.result.type}: {error}" if error
+                    else f"Batch request {entry.result.type}"
+                )
+            elif entry.result.message.stop_reason == "tool_use":
+                outcomes[entry.custom_id] = None
+            else:
+                outcomes[entry.custom_id] = self._anthropic_text(entry.result.message)
+        return outcomes
+
+    def _run_openai_batch(
+        self,
+        pending: Dict[str, Tuple[EmailClassification, Dict[str, Any]]]
+    ) -> Dict[str, Union[str, BaseException, None]]:
+        """
+        Classify emails through the OpenAI Batch API
+
+        Args:
+            pending: Emails and their context, keyed by batch custom_id
+
+        Returns:
+            Outcome per custom_id: the response text, None if the model
+            asked for a tool call, or the error
+        """
+        tools = self.tool_registry.get_tool_definitions_for_openai()
+        lines = [
+            orjson.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._openai_request(
+                    [
+                        {"role": "system", "content": self._get_system_prompt(context)},
+                        {"role": "user", "content": self._create_classification_prompt(email)}
+                    ],
+                    tools
+                )
+            })
+            for custom_id, (email, context) in pending.items()
+        ]
+
+        client = self.openai_client
+        input_file = client.files.create(
+            file=("classify_batch.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(self.config.batch_poll_interval)
+            batch = client.batches.retrieve(batch.id)
+
+        outcomes: Dict[str, Union[str, BaseException, None]] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                entry = orjson.loads(line)
+                response = entry.get("response") or {}
+                if entry.get("error") or response.get("status_code") != 200:
+                    outcomes[entry["custom_id"]] = RuntimeError(
+                        f"Batch request failed: {entry.get('error') or response.get('body')}"
+                    )
+                    continue
+                message = response["body"]["choices"][0]["message"]
+                outcomes[entry["custom_id"]] = (
+                    None if message.get("tool_calls") else message.get("content") or ""
+                )
+        return outcomes
+
+    def classify_batch(
+        self,
+        emails: List[EmailClassification]
+    ) -> List[Union[ClassificationResult, BaseException]]:
+        """
+        Classify emails through the provider's asynchronous batch API
+
+        Batch requests are billed at a discount but can take up to 24
+        hours, so this suits backfills and overnight triage rather than
+        interactive use. The call blocks, polling every
+        config.batch_poll_interval seconds, until the batch has ended.
+        Emails resolved without the LLM (caches, fast path) are not
+        submitted. Batches are single-turn, so an email for which the
+        model requests a tool call is re-classified synchronously.
+
+        Args:
+            emails: Emails to classify
+
+        Returns:
+            Results in the same order as emails. A failed classification is
+            returned as the exception instead of aborting the batch.
+        """
+        results: List[Union[ClassificationResult, BaseException, None]] = [None] * len(emails)
+        pending: Dict[str, Tuple[EmailClassification, Dict[str, Any]]] = {}
+        for index, email in enumerate(emails):
+            try:
+                result, context = self._prepare(email)
+            except Exception as e:
+                results[index] = e
+                continue
+            if result is not None:
+                results[index] = result
+            else:
+                pending[str(index)] = (email, context)
+
+        if not pending:
+            return results
+
+        anthropic_provider = self.config.llm_provider == "anthropic"
+        if anthropic_provider:
+            outcomes = self._run_anthropic_batch(pending)
+        else:
+            outcomes = self._run_openai_batch(pending)
+
+        for custom_id, (email, context) in pending.items():
+            outcome = outcomes.get(custom_id, RuntimeError("No result returned for batch request"))
+            try:
+                if isinstance(outcome, BaseException):
+                    raise outcome
+                if outcome is None:
+                    # Tool calls need a multi-turn exchange the batch API cannot run
+                    if anthropic_provider:
+                        result = self.classify_with_anthropic(email, context)
+                    else:
+                        result = self.classify_with_openai(email, context)
+                else:
+                    result = self._parse_classification_response(outcome, email)
+                self._record_result(email, result)
+                results[int(custom_id)] = result
+            except Exception as e:
+                results[int(custom_id)] = e
+
+        return results
+
     def provide_feedback(
         self,
         email: EmailClassification,
@@ -437,6 +1621,12 @@ Provide your response in the following JSON format:
         # Save feedback to file
         self._save_feedback(feedback)
 
+        # The stored result for this exact email is the one being corrected
+        if self.response_cache is not None:
+            self.response_cache.delete(self._generate_cache_key(email))
+        if self._rule_feedback is not None:
+            self._tally_rule_feedback(self._rule_feedback, email, correct_classification)
+
         # Update knowledge base with corrected classification
         self.knowledge_base.add_classification_history(
             email_id=f"{email_id}_corrected",
@@ -461,32 +1651,93 @@ Provide your response in the following JSON format:
             )
 
     def _generate_email_id(self, email: EmailClassification) -> str:
-        """Generate unique ID for an email"""
-        content = f"{email.subject}{email.body}{email.sender}{email.received_at}"
-        return hashlib.md5(content.encode()).hexdigest()
+        """
+        Generate unique ID for an email
+
+        The fields are fed to the hasher one at a time, NUL-separated, so
+        no concatenated copy of the email is built.
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        for part in (email.subject, email.body, email.sender, email.received_at):
+            hasher.update(str(part).encode())
+            hasher.update(b"\x00")
+        return hasher.hexdigest()
+
+    def _cache_namespace(self) -> str:
+        """Provider and model that produced results, so caches are not cross-used"""
+        model = (self.config.anthropic_model if self.config.llm_provider == "anthropic"
+                 else self.config.openai_model)
+        return f"{self.config.llm_provider}:{model}"
+
+    def _generate_cache_key(self, email: EmailClassification) -> str:
+        """
+        Generate the response cache key for an email
+
+        The key covers everything that shapes the LLM response: provider,
+        model, the whitespace-normalized email fields and the tool set.
+        """
+        model = (self.config.anthropic_model if self.config.llm_provider == "anthropic"
+                 else self.config.openai_model)
+        content = "|".join([
+            self.config.llm_provider,
+            model,
+            " ".join(email.subject.split()),
+            " ".join(email.body.split()),
+            email.sender or "",
+            self.tool_registry.fingerprint()
+        ])
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
 
     def _save_feedback(self, feedback: FeedbackEntry):
-        """Save feedback to feedback log file"""
-        import os
+        """
+        Append feedback to the feedback log file
 
+        The log is JSONL, one entry per line. Each entry goes out in a single
+        O_APPEND write, so saving is O(1) regardless of log size and
+        concurrent workers appending to the same file do not interleave.
+        """
         feedback_path = self.config.feedback_log_path
         os.makedirs(os.path.dirname(feedback_path), exist_ok=True)
 
-        # Load existing feedback
-        feedbacks = []
-        if os.path.exists(feedback_path):
-            with open(feedback_path, 'r') as f:
-                try:
-                    feedbacks = json.load(f)
-                except json.JSONDecodeError:
-                    feedbacks = []
+        line = orjson.dumps(feedback.model_dump(), default=str) + b"\n"
+        fd = os.open(feedback_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def read_feedback(self) -> Iterator[FeedbackEntry]:
+        """
+        Iterate over the entries in the feedback log
 
-        # Add new feedback
-        feedbacks.append(feedback.model_dump())
+        Lines that cannot be parsed (e.g. a write cut short by a crash) are
+        skipped. Logs written in the older single JSON array format are
+        read as a whole.
 
-        # Save back
-        with open(feedback_path, 'w') as f:
-            json.dump(feedbacks, f, indent=2, default=str)
+        Yields:
+            Feedback entries, oldest first
+        """
+        feedback_path = self.config.feedback_log_path
+        if not os.path.exists(feedback_path):
+            return
+
+        with open(feedback_path, 'rb') as f:
+            if f.read(1) == b"[":
+                f.seek(0)
+                try:
+                    yield from FEEDBACK_LIST_ADAPTER.validate_json(f.read())
+                except ValueError:
+                    pass
+                return
+
+            f.seek(0)
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield FeedbackEntry.model_validate_json(line)
+                except ValueError:
+                    continue
 
     def get_statistics(self) -> Dict[str, Any]:
         """Get statistics about the agent and knowledge base"""
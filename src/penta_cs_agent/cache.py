@@ -0,0 +1,88 @@
+"""
+Persistent on-disk cache for classification results
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class DiskCache:
+    """
+    SQLite-backed string key/value store with optional time-to-live
+
+    Used to persist LLM responses across runs so that re-classifying an
+    unchanged email does not pay for another API round-trip.
+    """
+
+    def __init__(self, cache_dir: str, ttl: Optional[float] = None,
+                 filename: str = "cache.sqlite3"):
+        """
+        Open (or create) the cache database
+
+        Args:
+            cache_dir: Directory holding the cache database
+            ttl: Seconds after which entries expire (None = never)
+            filename: Database file name inside cache_dir
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(cache_dir, filename),
+            check_same_thread=False
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        value, created_at = row
+        if self.ttl is not None and time.time() - created_at > self.ttl:
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key: str, value: str):
+        """Store value under key, replacing any previous entry"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        """Remove a single entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
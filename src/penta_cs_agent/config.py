@@ -4,15 +4,22 @@ Configuration management for the email classification agent
 
 import os
 from typing import Optional, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Bumped whenever the knowledge base layout changes (e.g. distance metric),
+# so a store built with an older layout is not silently reused
+KNOWLEDGE_BASE_SCHEMA_VERSION = 2
+DEFAULT_KNOWLEDGE_BASE_PATH = f"./data/knowledge_base_v{KNOWLEDGE_BASE_SCHEMA_VERSION}"
+
 
 class AgentConfig(BaseModel):
     """Configuration for the Email Classification Agent"""
 
+    model_config = ConfigDict(validate_assignment=True)
+
     # LLM Provider Settings
     llm_provider: Literal["anthropic", "openai"] = Field(
         default=os.getenv("LLM_PROVIDER", "anthropic"),
@@ -37,12 +44,26 @@ class AgentConfig(BaseModel):
 
     # Knowledge Base Settings
     knowledge_base_path: str = Field(
-        default=os.getenv("KNOWLEDGE_BASE_PATH", "./data/knowledge_base"),
+        default=os.getenv("KNOWLEDGE_BASE_PATH", DEFAULT_KNOWLEDGE_BASE_PATH),
         description="Path to knowledge base storage"
     )
+    history_flush_size: int = Field(
+        default=int(os.getenv("HISTORY_FLUSH_SIZE", "50")),
+        description="Classification history entries buffered before they are written to the knowledge base"
+    )
     feedback_log_path: str = Field(
-        default=os.getenv("FEEDBACK_LOG_PATH", "./data/feedback_log.json"),
-        description="Path to feedback log file"
+        default=os.getenv("FEEDBACK_LOG_PATH", "./data/feedback_log.jsonl"),
+        description="Path to feedback log file (JSONL, one entry per line)"
+    )
+
+    # Response Cache Settings
+    cache_dir: Optional[str] = Field(
+        default=os.getenv("LLM_CACHE_DIR"),
+        description="Directory for the on-disk LLM response cache (disabled when unset)"
+    )
+    cache_ttl: float = Field(
+        default=float(os.getenv("LLM_CACHE_TTL", "86400")),
+        description="Seconds before a cached LLM response expires"
     )
 
     # Agent Settings
@@ -54,6 +75,50 @@ class AgentConfig(BaseModel):
         default=os.getenv("ENABLE_LEARNING", "true").lower() == "true",
         description="Enable learning from feedback"
     )
+    enable_fast_path: bool = Field(
+        default=os.getenv("ENABLE_FAST_PATH", "false").lower() == "true",
+        description="Classify unambiguous emails with keyword rules instead of the LLM"
+    )
+    fast_path_threshold: float = Field(
+        default=float(os.getenv("FAST_PATH_THRESHOLD", "0.9")),
+        description="Minimum rule confidence for the fast path to bypass the LLM"
+    )
+    fast_path_min_accuracy: float = Field(
+        default=float(os.getenv("FAST_PATH_MIN_ACCURACY", "0.95")),
+        description="Minimum share of feedback confirming a rule's category for it to stay on the fast path"
+    )
+    enable_semantic_cache: bool = Field(
+        default=os.getenv("ENABLE_SEMANTIC_CACHE", "false").lower() == "true",
+        description="Reuse the classification of a near-duplicate past email or query instead of calling the LLM"
+    )
+    semantic_cache_threshold: float = Field(
+        default=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.15")),
+        description="Maximum cosine distance for a past email or query to count as a near-duplicate"
+    )
+    http2: bool = Field(
+        default=os.getenv("HTTP2", "false").lower() == "true",
+        description="Use HTTP/2 for LLM API requests (requires the h2 package)"
+    )
+    max_retries: int = Field(
+        default=int(os.getenv("MAX_RETRIES", "2")),
+        description="Retries with exponential backoff for rate-limited or failed LLM requests"
+    )
+    batch_mode: bool = Field(
+        default=os.getenv("BATCH_MODE", "false").lower() == "true",
+        description="Send classify_many through the provider batch API (discounted, up to 24h latency)"
+    )
+    batch_poll_interval: float = Field(
+        default=float(os.getenv("BATCH_POLL_INTERVAL", "30")),
+        description="Seconds between status checks while waiting for a batch"
+    )
+    max_body_tokens: Optional[int] = Field(
+        default=int(os.environ["MAX_BODY_TOKENS"]) if os.getenv("MAX_BODY_TOKENS") else None,
+        description="Truncate email bodies to this many tokens before prompting (unlimited when unset)"
+    )
+    max_concurrency: int = Field(
+        default=int(os.getenv("MAX_CONCURRENCY", "4")),
+        description="Maximum number of concurrent LLM requests in classify_many"
+    )
     max_tokens: int = Field(
         default=4096,
         description="Maximum tokens for LLM response"
@@ -63,9 +128,6 @@ class AgentConfig(BaseModel):
         description="Temperature for LLM (lower = more deterministic)"
     )
 
-    class Config:
-        validate_assignment = True
-
     def validate_keys(self) -> bool:
         """Validate that required API keys are present"""
         if self.llm_provider == "anthropic" and not self.anthropic_api_key:
@@ -0,0 +1,36 @@
+"""
+Shared registry of the default tools
+"""
+
+import threading
+
+from .tools import DEFAULT_TOOL_SPECS, ToolRegistry
+
+# Kept apart from tools.py so the module can stay plain Python when tools.py
+# is compiled with mypyc: a compiled module cannot take a module-level
+# __getattr__ hook or have globals() written at runtime.
+
+# Serializes the first build of default_registry across threads
+_DEFAULT_REGISTRY_LOCK = threading.Lock()
+
+
+def _build_default_registry() -> ToolRegistry:
+    registry = ToolRegistry()
+    registry.register_many(DEFAULT_TOOL_SPECS)
+    return registry
+
+
+def __getattr__(name: str):
+    # The default registry is built on first access, so importing
+    # ToolRegistry alone registers nothing; afterwards it is a plain
+    # module global and this hook is no longer reached. The build is
+    # double-checked under a lock so concurrent first accesses (e.g. from
+    # agents created in worker threads) all get the same instance.
+    if name == "default_registry":
+        with _DEFAULT_REGISTRY_LOCK:
+            registry = globals().get("default_registry")
+            if registry is None:
+                registry = _build_default_registry()
+                globals()["default_registry"] = registry
+        return registry
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,75 @@
+"""
+Rule-based pre-classification for emails whose intent is unambiguous
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .models import EmailCategory, EmailClassification, ClassificationResult
+
+
+# (category, pattern, confidence) rules. Patterns are deliberately narrow:
+# a rule should only fire on phrasing that leaves no doubt about intent.
+_RULES: List[Tuple[EmailCategory, str, float]] = [
+    (EmailCategory.QUOTE_REQUEST,
+     r"\brequest(?:ing)?\s+(?:for\s+)?(?:a\s+)?(?:price\s+)?quot(?:e|ation)\b", 0.95),
+    (EmailCategory.QUOTE_REQUEST,
+     r"\bquote\s+request\b", 0.95),
+    (EmailCategory.SAMPLE_REQUEST,
+     r"\bsample\s+request\b|\brequest(?:ing)?\s+(?:product\s+)?samples?\b", 0.93),
+    (EmailCategory.ORDER_INQUIRY,
+     r"\border\s*(?:#|no\.?|number)\s*\d+\b[^\n]{0,40}\b(?:status|tracking)\b", 0.92),
+    (EmailCategory.REGULATORY_COMPLIANCE,
+     r"\b(?:safety\s+data\s+sheet|sds|msds|certificate\s+of\s+analysis|coa)\s+request\b", 0.92),
+    (EmailCategory.BILLING_INQUIRY,
+     r"\binvoice\s*(?:#|no\.?|number)\s*[\w-]+", 0.85),
+    (EmailCategory.SPAM,
+     r"\bunsubscribe\b", 0.8),
+]
+
+_ACTIONS: Dict[EmailCategory, str] = {
+    EmailCategory.QUOTE_REQUEST: "Route to sales team for quote preparation",
+    EmailCategory.SAMPLE_REQUEST: "Route to sales team for sample fulfillment",
+    EmailCategory.ORDER_INQUIRY: "Route to order management for status update",
+    EmailCategory.REGULATORY_COMPLIANCE: "Route to regulatory team for documentation",
+    EmailCategory.BILLING_INQUIRY: "Route to accounts receivable",
+    EmailCategory.SPAM: "Archive without response",
+}
+
+# All rules compiled into one alternation so an email is scanned in a
+# single pass; the named group that matched identifies the rule
+_PATTERN = re.compile(
+    "|".join(f"(?P<r{i}>{pattern})" for i, (_, pattern, _) in enumerate(_RULES)),
+    re.IGNORECASE
+)
+
+
+def try_classify(email: EmailClassification) -> Optional[ClassificationResult]:
+    """
+    Classify an email from keyword rules alone
+
+    Args:
+        email: Email to classify
+
+    Returns:
+        Result for the highest-confidence matching rule, or None if no
+        rule matched
+    """
+    best: Optional[Tuple[EmailCategory, float, str]] = None
+    for text in (email.subject, email.body):
+        for match in _PATTERN.finditer(text):
+            category, _, confidence = _RULES[int(match.lastgroup[1:])]
+            if best is None or confidence > best[1]:
+                best = (category, confidence, match.group(0))
+
+    if best is None:
+        return None
+
+    # Every field comes from the rule table, so skip validation
+    category, confidence, matched = best
+    return ClassificationResult.model_construct(
+        primary_category=category,
+        confidence=confidence,
+        reasoning=f"Matched rule-based pattern: '{matched}'",
+        recommended_action=_ACTIONS[category]
+    )
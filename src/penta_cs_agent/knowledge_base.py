@@ -4,12 +4,172 @@ Knowledge base system for storing and retrieving email classification context
 
 import os
 import json
+import atexit
+import weakref
+import time
+import base64
+import threading
+import hashlib
+import operator
+from collections import OrderedDict, deque
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import numpy as np
 import chromadb
 from chromadb.config import Settings
+from chromadb.api.types import EmbeddingFunction
 from chromadb.utils import embedding_functions
 
+from .cache import DiskCache
+from .config import DEFAULT_KNOWLEDGE_BASE_PATH
+
+
+def _to_metadata(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert values to a Chroma-compatible metadata dict
+
+    Chroma only stores scalar metadata, so None values are dropped and
+    dicts and lists are stored as JSON strings.
+    """
+    return {
+        key: json.dumps(value) if isinstance(value, (dict, list)) else value
+        for key, value in values.items()
+        if value is not None
+    }
+
+
+# Comparison operators of Chroma's metadata filters
+_WHERE_OPERATORS = {
+    "$eq": operator.eq,
+    "$ne": operator.ne,
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+
+
+def _matches_where(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """
+    Evaluate a Chroma metadata filter against one entry's metadata
+
+    Supports field equality, the comparison operators and $and/$or, as
+    used by the agent's history lookups. Like Chroma, an entry missing a
+    filtered field does not match.
+
+    Raises:
+        ValueError: If the filter uses an operator not supported here
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise ValueError(f"Unsupported filter operator: {key}")
+        else:
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                compare = _WHERE_OPERATORS.get(op)
+                if compare is None:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                if value is None or not compare(value, operand):
+                    return False
+    return True
+
+
+class EmbeddingCache:
+    """
+    Memoizing front for an embedding function
+
+    Vectors are kept in an in-memory LRU and, optionally, in a persistent
+    DiskCache keyed by sha256(model name, text), so unchanged texts are
+    never re-embedded across searches or runs. Cache misses in a call are
+    embedded together in a single batch. Safe to share between threads.
+    """
+
+    def __init__(self, embedding_function: EmbeddingFunction,
+                 cache: Optional[DiskCache] = None, maxsize: int = 4096):
+        """
+        Args:
+            embedding_function: The underlying embedding function
+            cache: Optional persistent cache for vectors
+            maxsize: Maximum number of vectors kept in memory
+        """
+        self.embedding_function = embedding_function
+        self.cache = cache
+        self.maxsize = maxsize
+        # name() only exists on chromadb >= 0.6 embedders; older ones and
+        # plain callables are keyed by their class instead
+        name = getattr(embedding_function, "name", None)
+        self._model_name = name() if callable(name) else type(embedding_function).__qualname__
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Embed texts, computing only those not seen before
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One float32 vector per input text
+        """
+        keys = [self._key(text) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [self._lookup(key) for key in keys]
+
+        # Embed each distinct missing text once
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+
+        if missing:
+            computed = self.embedding_function(list(missing.values()))
+            fresh = {}
+            for key, vector in zip(missing, computed):
+                fresh[key] = np.asarray(vector, dtype=np.float32)
+                self._store(key, fresh[key])
+            vectors = [fresh[key] if vector is None else vector
+                       for key, vector in zip(keys, vectors)]
+
+        return vectors
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self._model_name}\x00{text}".encode()).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                return vector
+
+        if self.cache is not None:
+            encoded = self.cache.get(key)
+            if encoded is not None:
+                vector = np.frombuffer(base64.b64decode(encoded), dtype=np.float32)
+                self._remember(key, vector)
+                return vector
+        return None
+
+    def _store(self, key: str, vector: np.ndarray):
+        self._remember(key, vector)
+        if self.cache is not None:
+            self.cache.set(key, base64.b64encode(vector.tobytes()).decode("ascii"))
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
 
 class KnowledgeBase:
     """
@@ -17,14 +177,29 @@ class KnowledgeBase:
     common queries, and historical classification data
     """
 
-    def __init__(self, persist_directory: str = "./data/knowledge_base"):
+    def __init__(self, persist_directory: str = DEFAULT_KNOWLEDGE_BASE_PATH,
+                 history_flush_size: int = 50,
+                 embedding_function: Optional[EmbeddingFunction] = None,
+                 context_cache_size: int = 1024,
+                 context_cache_ttl: float = 300):
         """
         Initialize the knowledge base with ChromaDB
 
         Args:
             persist_directory: Directory to persist the vector database
+            history_flush_size: Number of buffered classification history
+                entries that triggers a write (1 = write immediately)
+            embedding_function: Embedder for documents and queries, e.g. an
+                int8-quantized ONNX model; defaults to Chroma's FP32
+                all-MiniLM-L6-v2. Vectors must match the dimension of any
+                collections already persisted in persist_directory.
+            context_cache_size: Maximum number of classification contexts
+                kept in memory (0 = disabled)
+            context_cache_ttl: Seconds a cached classification context
+                stays valid
         """
         self.persist_directory = persist_directory
+        self.history_flush_size = history_flush_size
         os.makedirs(persist_directory, exist_ok=True)
 
         # Initialize ChromaDB client
@@ -33,35 +208,82 @@ class KnowledgeBase:
             settings=Settings(anonymized_telemetry=False)
         )
 
-        # Use default embedding function (all-MiniLM-L6-v2)
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        # Use default embedding function (all-MiniLM-L6-v2) unless one is given
+        self.embedding_function = (
+            embedding_function or embedding_functions.DefaultEmbeddingFunction()
+        )
+
+        # Vectors are computed through the cache and handed to Chroma directly
+        self.embedding_cache = EmbeddingCache(
+            self.embedding_function,
+            cache=DiskCache(persist_directory, filename="embedding_cache.sqlite3")
+        )
 
         # Initialize collections
         self._init_collections()
 
+        # Classification history is buffered and written in batches; the
+        # exit hook only holds a weak reference so it does not keep the
+        # knowledge base alive
+        self._pending_history: "deque[Dict[str, Any]]" = deque()
+        self._history_lock = threading.Lock()
+        atexit.register(KnowledgeBase._flush_at_exit, weakref.ref(self))
+
+        # Product and common-query context by email content, as (stored_at,
+        # embedding, context). History is written on every classification,
+        # so it is never cached; product and query writes bump the version
+        # and clear the cache, and a context computed under an older
+        # version is not stored.
+        self.context_cache_size = context_cache_size
+        self.context_cache_ttl = context_cache_ttl
+        self._context_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._context_lock = threading.Lock()
+        self._version = 0
+
     def _init_collections(self):
-        """Initialize the different collections for knowledge storage"""
+        """
+        Initialize the different collections for knowledge storage
+
+        Collections use cosine distance, so callers can read
+        1 - distance as the cosine similarity of a result; top-k ranking
+        happens inside Chroma's native HNSW index.
+        """
         # Product information collection
         self.products_collection = self.client.get_or_create_collection(
             name="products",
             embedding_function=self.embedding_function,
-            metadata={"description": "Penta Fine Ingredients product catalog"}
+            metadata={"description": "Penta Fine Ingredients product catalog", "hnsw:space": "cosine"}
         )
 
         # Common queries and responses collection
         self.queries_collection = self.client.get_or_create_collection(
             name="common_queries",
             embedding_function=self.embedding_function,
-            metadata={"description": "Common customer queries and classifications"}
+            metadata={"description": "Common customer queries and classifications", "hnsw:space": "cosine"}
         )
 
         # Historical classifications collection
         self.history_collection = self.client.get_or_create_collection(
             name="classification_history",
             embedding_function=self.embedding_function,
-            metadata={"description": "Historical email classifications for learning"}
+            metadata={"description": "Historical email classifications for learning", "hnsw:space": "cosine"}
         )
 
+    @staticmethod
+    def _without_existing(collection: Any, items: List[Dict[str, Any]],
+                          id_key: str) -> List[Dict[str, Any]]:
+        """
+        Drop items whose id is already stored, so they are not re-embedded
+
+        Chroma rejects a whole add if an id repeats within it, so a batch
+        listing the same id more than once keeps only its last occurrence.
+        """
+        if not items:
+            return []
+        unique = list({item[id_key]: item for item in items}.values())
+        existing = set(collection.get(ids=[item[id_key] for item in unique], include=[])["ids"])
+        return [item for item in unique if item[id_key] not in existing]
+
     def add_product(self, product_id: str, name: str, description: str,
                    category: str, metadata: Optional[Dict[str, Any]] = None):
         """
@@ -74,18 +296,42 @@ class KnowledgeBase:
             category: Product category
             metadata: Additional product metadata
         """
-        doc_metadata = {
+        self.add_products_bulk([{
             "product_id": product_id,
             "name": name,
+            "description": description,
             "category": category,
-            **(metadata or {})
-        }
+            "metadata": metadata
+        }])
+
+    def add_products_bulk(self, products: List[Dict[str, Any]]):
+        """
+        Add several products in a single embedding batch and Chroma write
+
+        Args:
+            products: Dicts with the add_product arguments as keys
+                (product_id, name, description, category, optional metadata)
+        """
+        products = self._without_existing(self.products_collection, products, "product_id")
+        if not products:
+            return
 
+        documents = [f"{p['name']}: {p['description']}" for p in products]
         self.products_collection.add(
-            documents=[f"{name}: {description}"],
-            metadatas=[doc_metadata],
-            ids=[product_id]
+            documents=documents,
+            embeddings=self.embedding_cache.embed(documents),
+            metadatas=[
+                {
+                    "product_id": p["product_id"],
+                    "name": p["name"],
+                    "category": p["category"],
+                    **(p.get("metadata") or {})
+                }
+                for p in products
+            ],
+            ids=[p["product_id"] for p in products]
         )
+        self._invalidate_context_cache()
 
     def add_common_query(self, query_id: str, query_text: str,
                         classification: str, confidence: float,
@@ -100,19 +346,45 @@ class KnowledgeBase:
             confidence: Confidence score
             metadata: Additional metadata
         """
-        doc_metadata = {
+        self.add_common_queries_bulk([{
             "query_id": query_id,
+            "query_text": query_text,
             "classification": classification,
             "confidence": confidence,
-            "added_at": datetime.now().isoformat(),
-            **(metadata or {})
-        }
+            "metadata": metadata
+        }])
 
+    def add_common_queries_bulk(self, queries: List[Dict[str, Any]]):
+        """
+        Add several common queries in a single embedding batch and Chroma write
+
+        Args:
+            queries: Dicts with the add_common_query arguments as keys
+                (query_id, query_text, classification, confidence,
+                optional metadata)
+        """
+        queries = self._without_existing(self.queries_collection, queries, "query_id")
+        if not queries:
+            return
+
+        added_at = datetime.now().isoformat()
+        documents = [q["query_text"] for q in queries]
         self.queries_collection.add(
-            documents=[query_text],
-            metadatas=[doc_metadata],
-            ids=[query_id]
+            documents=documents,
+            embeddings=self.embedding_cache.embed(documents),
+            metadatas=[
+                {
+                    "query_id": q["query_id"],
+                    "classification": q["classification"],
+                    "confidence": q["confidence"],
+                    "added_at": added_at,
+                    **(q.get("metadata") or {})
+                }
+                for q in queries
+            ],
+            ids=[q["query_id"] for q in queries]
         )
+        self._invalidate_context_cache()
 
     def add_classification_history(self, email_id: str, email_content: str,
                                    classification: str, confidence: float,
@@ -127,38 +399,102 @@ class KnowledgeBase:
             classification: Classification category
             confidence: Confidence score
             was_correct: Whether the classification was correct (from feedback)
-            metadata: Additional metadata
+            metadata: Additional metadata; None values are dropped and
+                dicts/lists stored as JSON strings
         """
-        doc_metadata = {
+        doc_metadata = _to_metadata({
             "email_id": email_id,
             "classification": classification,
             "confidence": confidence,
             "was_correct": was_correct,
             "timestamp": datetime.now().isoformat(),
+            "created_at": time.time(),
             **(metadata or {})
-        }
+        })
 
-        self.history_collection.add(
-            documents=[email_content],
-            metadatas=[doc_metadata],
-            ids=[email_id]
-        )
+        with self._history_lock:
+            self._pending_history.append({
+                "email_id": email_id,
+                "email_content": email_content,
+                "metadata": doc_metadata
+            })
+            pending = len(self._pending_history)
 
-    def search_products(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+        if pending >= self.history_flush_size:
+            self.flush_history()
+
+    def flush_history(self):
         """
-        Search for relevant products based on query
+        Write buffered classification history to Chroma
+
+        All pending entries are embedded in one batch and stored with a
+        single add. Searches merge in the entries still pending instead of
+        flushing, so buffering neither hides an entry nor puts a write on
+        the read path. If the write fails the entries are kept for the
+        next flush.
+        """
+        with self._history_lock:
+            if not self._pending_history:
+                return
+            entries = list(self._pending_history)
+            self._pending_history.clear()
+
+        # Chroma rejects duplicate ids within one add; keep the first, as
+        # a separate add of an existing id would have been ignored
+        unique: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            unique.setdefault(entry["email_id"], entry)
+        batch = list(unique.values())
+
+        try:
+            documents = [entry["email_content"] for entry in batch]
+            self.history_collection.add(
+                documents=documents,
+                embeddings=self.embedding_cache.embed(documents),
+                metadatas=[entry["metadata"] for entry in batch],
+                ids=[entry["email_id"] for entry in batch]
+            )
+        except Exception:
+            with self._history_lock:
+                self._pending_history.extendleft(reversed(entries))
+            raise
+
+    def _invalidate_context_cache(self):
+        """Drop cached product and query context after a write to either"""
+        with self._context_lock:
+            self._version += 1
+            self._context_cache.clear()
+
+    @staticmethod
+    def _flush_at_exit(ref: "weakref.ReferenceType[KnowledgeBase]"):
+        kb = ref()
+        if kb is None:
+            return
+        try:
+            kb.flush_history()
+        except Exception as e:
+            print(f"Error flushing classification history: {e}")
+
+    def _query(self, collection: Any, embedding: np.ndarray, n_results: int,
+               label: str, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Query a collection with a precomputed embedding
 
         Args:
-            query: Search query
+            collection: Collection to search
+            embedding: Query vector
             n_results: Number of results to return
+            label: What is being searched, for error messages
+            where: Optional Chroma metadata filter
 
         Returns:
-            List of relevant products with metadata
+            List of results with document, metadata and distance
         """
         try:
-            results = self.products_collection.query(
-                query_texts=[query],
-                n_results=n_results
+            results = collection.query(
+                query_embeddings=[embedding],
+                n_results=n_results,
+                where=where
             )
 
             if not results["documents"][0]:
@@ -177,99 +513,199 @@ class KnowledgeBase:
                 )
             ]
         except Exception as e:
-            print(f"Error searching products: {e}")
+            print(f"Error searching {label}: {e}")
             return []
 
-    def search_similar_queries(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+    def _search_history(self, embedding: np.ndarray, n_results: int,
+                        where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
-        Search for similar historical queries
+        Query the history collection together with the unflushed buffer
+
+        Pending entries are ranked by cosine distance, as Chroma ranks the
+        stored ones, and merged into its results. Their documents are the
+        email contents classified moments earlier, so their vectors usually
+        come straight from the embedding cache.
 
         Args:
-            query: Query text
+            embedding: Query vector
             n_results: Number of results to return
+            where: Optional Chroma metadata filter
 
         Returns:
-            List of similar queries with their classifications
+            List of results with document, metadata and distance
         """
+        with self._history_lock:
+            pending = list(self._pending_history)
+        if pending and where is not None:
+            try:
+                pending = [entry for entry in pending if _matches_where(entry["metadata"], where)]
+            except ValueError:
+                # A filter the buffer cannot evaluate; let Chroma answer it.
+                # A failed write keeps the entries buffered, and the search
+                # then covers persisted history only
+                pending = []
+                try:
+                    self.flush_history()
+                except Exception as e:
+                    print(f"Error flushing classification history: {e}")
+
+        results = self._query(self.history_collection, embedding, n_results, "history", where)
+
+        # A stored entry wins over a pending one with the same id, as the
+        # flush would ignore the pending copy
+        seen = {hit["metadata"].get("email_id") for hit in results}
+        unique: Dict[str, Dict[str, Any]] = {}
+        for entry in pending:
+            if entry["email_id"] not in seen:
+                unique.setdefault(entry["email_id"], entry)
+        if not unique:
+            return results
+
+        entries = list(unique.values())
         try:
-            results = self.queries_collection.query(
-                query_texts=[query],
-                n_results=n_results
+            vectors = np.asarray(
+                self.embedding_cache.embed([entry["email_content"] for entry in entries]),
+                dtype=np.float64
             )
+        except Exception as e:
+            print(f"Error searching pending history: {e}")
+            return results
+
+        query = np.asarray(embedding, dtype=np.float64)
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        distances = 1.0 - (vectors @ query) / np.where(norms == 0, 1.0, norms)
+
+        merged = results + [
+            {
+                "document": entry["email_content"],
+                "metadata": entry["metadata"],
+                "distance": float(distance)
+            }
+            for entry, distance in zip(entries, distances)
+        ]
+        merged.sort(key=lambda hit: hit["distance"])
+        return merged[:n_results]
+
+    def _embed_query(self, query: str, label: str) -> Optional[np.ndarray]:
+        """Embed a query, returning None (and reporting) on failure"""
+        try:
+            return self.embedding_cache.embed([query])[0]
+        except Exception as e:
+            print(f"Error searching {label}: {e}")
+            return None
 
-            if not results["documents"][0]:
-                return []
+    def search_products(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search for relevant products based on query
 
-            return [
-                {
-                    "document": doc,
-                    "metadata": meta,
-                    "distance": dist
-                }
-                for doc, meta, dist in zip(
-                    results["documents"][0],
-                    results["metadatas"][0],
-                    results["distances"][0]
-                )
-            ]
-        except Exception as e:
-            print(f"Error searching queries: {e}")
+        Args:
+            query: Search query
+            n_results: Number of results to return
+
+        Returns:
+            List of relevant products with metadata
+        """
+        embedding = self._embed_query(query, "products")
+        if embedding is None:
             return []
+        return self._query(self.products_collection, embedding, n_results, "products")
 
-    def search_classification_history(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+    def search_similar_queries(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
         """
-        Search classification history for similar emails
+        Search for similar historical queries
 
         Args:
             query: Query text
             n_results: Number of results to return
 
         Returns:
-            List of similar historical classifications
+            List of similar queries with their classifications
         """
-        try:
-            results = self.history_collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+        embedding = self._embed_query(query, "queries")
+        if embedding is None:
+            return []
+        return self._query(self.queries_collection, embedding, n_results, "queries")
 
-            if not results["documents"][0]:
-                return []
+    def search_classification_history(self, query: str, n_results: int = 5,
+                                      where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Search classification history for similar emails
 
-            return [
-                {
-                    "document": doc,
-                    "metadata": meta,
-                    "distance": dist
-                }
-                for doc, meta, dist in zip(
-                    results["documents"][0],
-                    results["metadatas"][0],
-                    results["distances"][0]
-                )
-            ]
-        except Exception as e:
-            print(f"Error searching history: {e}")
+        Args:
+            query: Query text
+            n_results: Number of results to return
+            where: Optional Chroma metadata filter
+
+        Returns:
+            List of similar historical classifications
+        """
+        embedding = self._embed_query(query, "history")
+        if embedding is None:
             return []
+        return self._search_history(embedding, n_results, where)
 
     def get_context_for_classification(self, email_content: str) -> Dict[str, Any]:
         """
         Get relevant context from knowledge base for email classification
 
+        The email is embedded once and the vector reused for all three
+        collections. The product and common-query results are cached by
+        email content (with the vector) until they expire or either
+        collection is written to, so recurring emails only pay for the
+        history lookup, which always reflects the latest classifications.
+
         Args:
             email_content: Email content to classify
 
         Returns:
             Dictionary with relevant context from all collections
         """
+        cached = self._cached_context(email_content)
+        if cached is not None:
+            embedding, context = cached
+        else:
+            with self._context_lock:
+                version = self._version
+
+            embedding = self._embed_query(email_content, "knowledge base")
+            if embedding is None:
+                return {"similar_queries": [], "relevant_products": [], "similar_history": []}
+
+            context = {
+                "similar_queries": self._query(self.queries_collection, embedding, 3, "queries"),
+                "relevant_products": self._query(self.products_collection, embedding, 3, "products")
+            }
+
+            if self.context_cache_size > 0:
+                with self._context_lock:
+                    if version == self._version:
+                        self._context_cache[email_content] = (time.monotonic(), embedding, context)
+                        self._context_cache.move_to_end(email_content)
+                        while len(self._context_cache) > self.context_cache_size:
+                            self._context_cache.popitem(last=False)
+
         return {
-            "similar_queries": self.search_similar_queries(email_content, n_results=3),
-            "relevant_products": self.search_products(email_content, n_results=3),
-            "similar_history": self.search_classification_history(email_content, n_results=3)
+            "similar_queries": list(context["similar_queries"]),
+            "relevant_products": list(context["relevant_products"]),
+            "similar_history": self._search_history(embedding, 3)
         }
 
+    def _cached_context(self, email_content: str) -> Optional[tuple]:
+        """Return the (embedding, context) of a live cache entry, or None"""
+        with self._context_lock:
+            entry = self._context_cache.get(email_content)
+            if entry is None:
+                return None
+            stored_at, embedding, context = entry
+            if time.monotonic() - stored_at > self.context_cache_ttl:
+                del self._context_cache[email_content]
+                return None
+            self._context_cache.move_to_end(email_content)
+        return embedding, context
+
     def get_stats(self) -> Dict[str, int]:
         """Get statistics about the knowledge base"""
+        self.flush_history()
         return {
             "total_products": self.products_collection.count(),
             "total_queries": self.queries_collection.count(),
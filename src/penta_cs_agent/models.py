@@ -2,10 +2,11 @@
 Data models for email classification
 """
 
+import sys
 from enum import Enum
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, TypeAdapter
 
 
 class EmailCategory(str, Enum):
@@ -27,36 +28,61 @@ class EmailCategory(str, Enum):
     @classmethod
     def get_description(cls, category: "EmailCategory") -> str:
         """Get human-readable description of category"""
-        descriptions = {
-            cls.QUOTE_REQUEST: "Customer requesting a price quote for one or more products",
-            cls.ORDER_PLACEMENT: "Customer placing a new order or ready to purchase",
-            cls.ORDER_INQUIRY: "Customer asking about status, tracking, or details of an existing order",
-            cls.PRODUCT_INQUIRY: "Customer asking questions about product specifications, availability, or information",
-            cls.TECHNICAL_SUPPORT: "Customer needs technical help with product application, formulation, or usage",
-            cls.SHIPPING_INQUIRY: "Customer asking about shipping options, costs, delivery times, or logistics",
-            cls.BILLING_INQUIRY: "Customer has questions about invoices, payments, or account balance",
-            cls.COMPLAINT: "Customer expressing dissatisfaction or reporting an issue",
-            cls.REGULATORY_COMPLIANCE: "Questions about certifications, regulatory compliance, safety data sheets, or documentation",
-            cls.SAMPLE_REQUEST: "Customer requesting product samples for testing or evaluation",
-            cls.GENERAL_INQUIRY: "General questions about the company, policies, or other topics",
-            cls.SPAM: "Unsolicited, irrelevant, or marketing emails not related to customer service",
-        }
-        return descriptions.get(category, "Unknown category")
+        return _CATEGORY_DESCRIPTIONS.get(category, "Unknown category")
+
+
+# Built once at import; an attribute inside the enum body would become a member
+_CATEGORY_DESCRIPTIONS: Dict[EmailCategory, str] = {
+    EmailCategory.QUOTE_REQUEST: "Customer requesting a price quote for one or more products",
+    EmailCategory.ORDER_PLACEMENT: "Customer placing a new order or ready to purchase",
+    EmailCategory.ORDER_INQUIRY: "Customer asking about status, tracking, or details of an existing order",
+    EmailCategory.PRODUCT_INQUIRY: "Customer asking questions about product specifications, availability, or information",
+    EmailCategory.TECHNICAL_SUPPORT: "Customer needs technical help with product application, formulation, or usage",
+    EmailCategory.SHIPPING_INQUIRY: "Customer asking about shipping options, costs, delivery times, or logistics",
+    EmailCategory.BILLING_INQUIRY: "Customer has questions about invoices, payments, or account balance",
+    EmailCategory.COMPLAINT: "Customer expressing dissatisfaction or reporting an issue",
+    EmailCategory.REGULATORY_COMPLIANCE: "Questions about certifications, regulatory compliance, safety data sheets, or documentation",
+    EmailCategory.SAMPLE_REQUEST: "Customer requesting product samples for testing or evaluation",
+    EmailCategory.GENERAL_INQUIRY: "General questions about the company, policies, or other topics",
+    EmailCategory.SPAM: "Unsolicited, irrelevant, or marketing emails not related to customer service",
+}
 
 
 class EmailClassification(BaseModel):
     """Input model for email to be classified"""
 
+    model_config = ConfigDict(frozen=True)
+
     subject: str = Field(..., description="Email subject line")
     body: str = Field(..., description="Email body content")
     sender: Optional[str] = Field(None, description="Sender email address")
     received_at: Optional[datetime] = Field(default_factory=datetime.now, description="When email was received")
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict, description="Additional metadata")
 
+    @classmethod
+    def validate_batch(cls, raw: Union[List[Any], str, bytes]) -> List["EmailClassification"]:
+        """
+        Validate many incoming emails in a single pydantic-core pass
+
+        Args:
+            raw: List of email dicts (or instances), or a JSON array
+
+        Returns:
+            Validated emails, in input order
+        """
+        if isinstance(raw, (str, bytes)):
+            return EMAIL_BATCH_ADAPTER.validate_json(raw)
+        return EMAIL_BATCH_ADAPTER.validate_python(raw)
+
 
 class ClassificationResult(BaseModel):
     """Result of email classification"""
 
+    # Datetimes serialize natively to ISO 8601, with no Python callback.
+    # Frozen, so one instance can be shared by the caches and callers;
+    # use model_copy(update=...) to derive a changed result
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     primary_category: EmailCategory = Field(..., description="Primary classification category")
     confidence: float = Field(..., ge=0.0, le=1.0, description="Confidence score (0-1)")
     secondary_categories: List[EmailCategory] = Field(default_factory=list, description="Other possible categories")
@@ -66,15 +92,16 @@ class ClassificationResult(BaseModel):
     priority: str = Field(default="normal", description="Priority level: low, normal, high, urgent")
     timestamp: datetime = Field(default_factory=datetime.now, description="Classification timestamp")
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    # Set on the fallback built when an LLM response could not be parsed,
+    # so it is not cached; not serialized
+    _parse_failed: bool = PrivateAttr(default=False)
 
 
 class FeedbackEntry(BaseModel):
     """Feedback entry for learning system"""
 
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     email_id: str = Field(..., description="Unique identifier for the email")
     original_classification: EmailCategory = Field(..., description="Original classification")
     correct_classification: EmailCategory = Field(..., description="Correct classification")
@@ -83,7 +110,12 @@ class FeedbackEntry(BaseModel):
     feedback_timestamp: datetime = Field(default_factory=datetime.now, description="When feedback was provided")
     notes: Optional[str] = Field(None, description="Additional notes")
 
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+
+# Allowed ClassificationResult.priority values. Interned so that a priority
+# normalized against this set is the same str object as the constant
+PRIORITY_LEVELS = frozenset(map(sys.intern, ("low", "normal", "high", "urgent")))
+
+
+# Built once; constructing a TypeAdapter compiles its validator and serializer
+EMAIL_BATCH_ADAPTER = TypeAdapter(List[EmailClassification])
+FEEDBACK_LIST_ADAPTER = TypeAdapter(List[FeedbackEntry])
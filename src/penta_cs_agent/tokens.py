@@ -0,0 +1,51 @@
+"""
+Token counting for prompt budgeting
+"""
+
+from functools import lru_cache
+from typing import Any
+
+
+# Budgeting only needs an estimate that is consistent across providers, so
+# a single tiktoken encoding is used for every model
+ENCODING_NAME = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> Any:
+    """Load the tiktoken encoding on first use"""
+    import tiktoken
+    return tiktoken.get_encoding(ENCODING_NAME)
+
+
+@lru_cache(maxsize=2048)
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens in text
+
+    Results are memoized, so repeated bodies are only tokenized once.
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Number of tokens
+    """
+    return len(_get_encoding().encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Truncate text to at most max_tokens tokens
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget
+
+    Returns:
+        The original text if it fits the budget, else its leading tokens
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    return encoding.decode(encoding.encode(text)[:max_tokens])
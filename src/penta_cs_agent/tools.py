@@ -2,19 +2,63 @@
 Function calling framework for external integrations
 """
 
-from typing import Callable, Dict, Any, List, Optional
-from dataclasses import dataclass
-import json
+from typing import Callable, Dict, Any, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+import copy
+import hashlib
+import inspect
 
+import orjson
 
-@dataclass
-class ToolDefinition:
+
+class ToolDefinition(NamedTuple):
     """Definition of a tool/function that can be called by the agent"""
 
     name: str
     description: str
     parameters: Dict[str, Any]
     function: Callable
+    # Canonical JSON of the schema, serialized once at registration
+    schema_json: str = ""
+    # Arguments the function cannot be called without, from its signature
+    required_args: FrozenSet[str] = frozenset()
+
+
+def _required_args(function: Callable) -> FrozenSet[str]:
+    """Names of the keyword-passable parameters of function that have no default"""
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        # No introspectable signature; leave checking to the call itself
+        return frozenset()
+    return frozenset(
+        p.name for p in parameters
+        if p.default is inspect.Parameter.empty
+        and p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+    )
+
+
+def _build_definition(name: str, description: str, parameters: Dict[str, Any],
+                      function: Callable) -> ToolDefinition:
+    """Build the stored definition of a tool, with its derived fields"""
+    # The registry keeps its own copy, so the cached provider lists and
+    # schema_json cannot drift if the caller's dict is changed later
+    parameters = copy.deepcopy(parameters)
+    return ToolDefinition(
+        name=name,
+        description=description,
+        parameters=parameters,
+        function=function,
+        schema_json=orjson.dumps(
+            {"name": name, "description": description, "input_schema": parameters},
+            option=orjson.OPT_SORT_KEYS
+        ).decode(),
+        required_args=_required_args(function)
+    )
+
+
+def _error_result(tool: str, error_type: str, message: str) -> Dict[str, Any]:
+    """Tool result reporting a failed call, in a shape callers can match on"""
+    return {"error": {"type": error_type, "message": message}, "tool": tool}
 
 
 class ToolRegistry:
@@ -24,6 +68,11 @@ class ToolRegistry:
 
     def __init__(self):
         self._tools: Dict[str, ToolDefinition] = {}
+        self._fingerprint: Optional[str] = None
+        # Provider-format definitions, built on first request
+        self._anthropic_definitions: Optional[List[Dict[str, Any]]] = None
+        self._openai_definitions: Optional[List[Dict[str, Any]]] = None
+        self._tool_names: Optional[Tuple[str, ...]] = None
 
     def register(
         self,
@@ -41,13 +90,28 @@ class ToolRegistry:
             parameters: JSON schema for the tool parameters
             function: The callable function
         """
-        tool = ToolDefinition(
-            name=name,
-            description=description,
-            parameters=parameters,
-            function=function
+        self._tools[name] = _build_definition(name, description, parameters, function)
+        self._invalidate()
+
+    def register_many(self, specs: Iterable[Dict[str, Any]]):
+        """
+        Register several tools, invalidating the cached views only once
+
+        Args:
+            specs: Dicts of register() keyword arguments (name,
+                description, parameters, function)
+        """
+        self._tools.update(
+            (spec["name"], _build_definition(**spec)) for spec in specs
         )
-        self._tools[name] = tool
+        self._invalidate()
+
+    def _invalidate(self):
+        """Drop everything derived from the registered tools"""
+        self._fingerprint = None
+        self._anthropic_definitions = None
+        self._openai_definitions = None
+        self._tool_names = None
 
     def register_decorator(self, name: str, description: str, parameters: Dict[str, Any]):
         """
@@ -82,93 +146,117 @@ class ToolRegistry:
         """Get a tool by name"""
         return self._tools.get(name)
 
-    def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+    def call_tool(self, name: str, arguments: Any) -> Any:
         """
         Call a tool by name with arguments
 
         Args:
             name: Tool name
-            arguments: Tool arguments
+            arguments: Tool arguments, as decoded from the LLM; anything
+                but a dict is reported as an error result
 
         Returns:
-            Tool execution result
+            Tool execution result, or {"error": {"type", "message"}, "tool"}
+            if the tool raised or required arguments are missing
         """
         tool = self.get_tool(name)
         if not tool:
             raise ValueError(f"Tool '{name}' not found")
 
+        # Checked against the signature captured at registration, so a
+        # malformed call from the LLM is rejected without invoking the tool
+        if not isinstance(arguments, dict):
+            return _error_result(name, "TypeError", "Tool arguments must be an object")
+        if not tool.required_args <= arguments.keys():
+            missing = ", ".join(sorted(arg for arg in tool.required_args if arg not in arguments))
+            return _error_result(name, "TypeError", f"Missing required arguments: {missing}")
+
         try:
             return tool.function(**arguments)
         except Exception as e:
-            return {"error": str(e), "tool": name}
+            return _error_result(name, type(e).__name__, str(e))
 
     def get_tool_definitions_for_anthropic(self) -> List[Dict[str, Any]]:
         """
         Get tool definitions in Anthropic's format
 
+        Built once and reused until the next registration; the list is
+        shared between callers and must not be modified.
+
         Returns:
             List of tool definitions for Anthropic API
         """
-        return [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "input_schema": tool.parameters
-            }
-            for tool in self._tools.values()
-        ]
+        if self._anthropic_definitions is None:
+            self._anthropic_definitions = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "input_schema": tool.parameters
+                }
+                for tool in self._tools.values()
+            ]
+        return self._anthropic_definitions
 
     def get_tool_definitions_for_openai(self) -> List[Dict[str, Any]]:
         """
         Get tool definitions in OpenAI's format
 
+        Built once and reused until the next registration; the list is
+        shared between callers and must not be modified.
+
         Returns:
             List of tool definitions for OpenAI API
         """
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "parameters": tool.parameters
+        if self._openai_definitions is None:
+            self._openai_definitions = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "parameters": tool.parameters
+                    }
                 }
-            }
-            for tool in self._tools.values()
-        ]
+                for tool in self._tools.values()
+            ]
+        return self._openai_definitions
 
-    def list_tools(self) -> List[str]:
-        """List all registered tool names"""
-        return list(self._tools.keys())
+    def fingerprint(self) -> str:
+        """
+        Get a stable hash of the registered tool definitions
+
+        Assembled from the per-tool JSON serialized at registration and
+        memoized until the next registration.
+
+        Returns:
+            Hex digest that changes whenever a tool's name, description
+            or parameter schema changes
+        """
+        if self._fingerprint is None:
+            payload = "[" + ",".join(
+                self._tools[name].schema_json for name in sorted(self._tools)
+            ) + "]"
+            self._fingerprint = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+        return self._fingerprint
+
+    def list_tools(self) -> Tuple[str, ...]:
+        """List all registered tool names, in registration order"""
+        # Immutable, so the same tuple is handed out until the next registration
+        if self._tool_names is None:
+            self._tool_names = tuple(self._tools)
+        return self._tool_names
 
     def get_tool_count(self) -> int:
         """Get the number of registered tools"""
         return len(self._tools)
 
-
-# Default tool registry instance
-default_registry = ToolRegistry()
+    def __contains__(self, name: object) -> bool:
+        """Check whether a tool is registered under name"""
+        return name in self._tools
 
 
 # Example default tools for Penta Fine Ingredients
 
-@default_registry.register_decorator(
-    name="lookup_order",
-    description="Look up an order by order ID or customer email",
-    parameters={
-        "type": "object",
-        "properties": {
-            "order_id": {
-                "type": "string",
-                "description": "The order ID to look up"
-            },
-            "customer_email": {
-                "type": "string",
-                "description": "Customer email address"
-            }
-        }
-    }
-)
 def lookup_order(order_id: Optional[str] = None, customer_email: Optional[str] = None) -> Dict[str, Any]:
     """
     Look up order information (placeholder implementation)
@@ -182,24 +270,6 @@ def lookup_order(order_id: Optional[str] = None, customer_email: Optional[str] =
     }
 
 
-@default_registry.register_decorator(
-    name="check_product_availability",
-    description="Check if a product is available and get current pricing",
-    parameters={
-        "type": "object",
-        "properties": {
-            "product_name": {
-                "type": "string",
-                "description": "Name of the product"
-            },
-            "product_id": {
-                "type": "string",
-                "description": "Product ID or SKU"
-            }
-        },
-        "required": ["product_name"]
-    }
-)
 def check_product_availability(product_name: str, product_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Check product availability (placeholder implementation)
@@ -215,28 +285,6 @@ def check_product_availability(product_name: str, product_id: Optional[str] = No
     }
 
 
-@default_registry.register_decorator(
-    name="get_shipping_quote",
-    description="Get a shipping quote for a location and quantity",
-    parameters={
-        "type": "object",
-        "properties": {
-            "destination": {
-                "type": "string",
-                "description": "Destination address or zip code"
-            },
-            "weight": {
-                "type": "number",
-                "description": "Weight in pounds"
-            },
-            "quantity": {
-                "type": "number",
-                "description": "Quantity of items"
-            }
-        },
-        "required": ["destination"]
-    }
-)
 def get_shipping_quote(destination: str, weight: Optional[float] = None,
                       quantity: Optional[int] = None) -> Dict[str, Any]:
     """
@@ -252,20 +300,6 @@ def get_shipping_quote(destination: str, weight: Optional[float] = None,
     }
 
 
-@default_registry.register_decorator(
-    name="search_knowledge_base",
-    description="Search the company knowledge base for information",
-    parameters={
-        "type": "object",
-        "properties": {
-            "query": {
-                "type": "string",
-                "description": "Search query"
-            }
-        },
-        "required": ["query"]
-    }
-)
 def search_knowledge_base(query: str) -> Dict[str, Any]:
     """
     Search knowledge base (placeholder implementation)
@@ -277,3 +311,84 @@ def search_knowledge_base(query: str) -> Dict[str, Any]:
         "query": query,
         "results": []
     }
+
+
+# Registered in one pass into default_tools.default_registry on first access
+DEFAULT_TOOL_SPECS: List[Dict[str, Any]] = [
+    {
+        "name": "lookup_order",
+        "description": "Look up an order by order ID or customer email",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "order_id": {
+                    "type": "string",
+                    "description": "The order ID to look up"
+                },
+                "customer_email": {
+                    "type": "string",
+                    "description": "Customer email address"
+                }
+            }
+        },
+        "function": lookup_order
+    },
+    {
+        "name": "check_product_availability",
+        "description": "Check if a product is available and get current pricing",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "product_name": {
+                    "type": "string",
+                    "description": "Name of the product"
+                },
+                "product_id": {
+                    "type": "string",
+                    "description": "Product ID or SKU"
+                }
+            },
+            "required": ["product_name"]
+        },
+        "function": check_product_availability
+    },
+    {
+        "name": "get_shipping_quote",
+        "description": "Get a shipping quote for a location and quantity",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "destination": {
+                    "type": "string",
+                    "description": "Destination address or zip code"
+                },
+                "weight": {
+                    "type": "number",
+                    "description": "Weight in pounds"
+                },
+                "quantity": {
+                    "type": "number",
+                    "description": "Quantity of items"
+                }
+            },
+            "required": ["destination"]
+        },
+        "function": get_shipping_quote
+    },
+    {
+        "name": "search_knowledge_base",
+        "description": "Search the company knowledge base for information",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query"
+                }
+            },
+            "required": ["query"]
+        },
+        "function": search_knowledge_base
+    }
+]
+
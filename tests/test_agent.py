@@ -4,16 +4,25 @@ Note: These tests require valid API keys and will make actual API calls
 For unit testing without API calls, mock the LLM responses
 """
 
+import asyncio
+import json
 import pytest
 import os
 import tempfile
 import shutil
+import subprocess
+import sys
+import threading
+from types import SimpleNamespace
 from src.penta_cs_agent import (
     EmailClassificationAgent,
     EmailClassification,
     EmailCategory,
     AgentConfig
 )
+from src.penta_cs_agent.agent import _JsonObjectScanner
+from src.penta_cs_agent.models import ClassificationResult, FeedbackEntry, PRIORITY_LEVELS
+from src.penta_cs_agent.knowledge_base import KnowledgeBase
 from src.penta_cs_agent.tools import ToolRegistry
 
 
@@ -31,12 +40,23 @@ def mock_config(temp_data_dir):
     # This will use API keys from environment
     config = AgentConfig(
         knowledge_base_path=os.path.join(temp_data_dir, "kb"),
-        feedback_log_path=os.path.join(temp_data_dir, "feedback.json"),
+        feedback_log_path=os.path.join(temp_data_dir, "feedback.jsonl"),
         enable_learning=True
     )
     return config
 
 
+def test_package_import_defers_agent():
+    """Test that importing the package does not load the LLM SDKs"""
+    code = (
+        "import sys; import src.penta_cs_agent as pkg; "
+        "assert 'anthropic' not in sys.modules and 'chromadb' not in sys.modules; "
+        "assert pkg.EmailClassificationAgent.__name__ == 'EmailClassificationAgent'"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
 def test_agent_initialization(mock_config):
     """Test agent initialization"""
     agent = EmailClassificationAgent(config=mock_config)
@@ -46,6 +66,71 @@ def test_agent_initialization(mock_config):
     assert agent.knowledge_base is not None
 
 
+def test_llm_client_is_lazy_and_shared(mock_config):
+    """Test that provider clients are built on first use and shared across agents"""
+    agent1 = EmailClassificationAgent(config=mock_config)
+    agent2 = EmailClassificationAgent(config=mock_config)
+
+    assert "anthropic_client" not in agent1.__dict__
+    assert "openai_client" not in agent1.__dict__
+
+    if mock_config.llm_provider == "anthropic":
+        assert agent1.anthropic_client is not None
+        assert agent1.anthropic_client is agent2.anthropic_client
+        assert agent1.openai_client is None
+    else:
+        assert agent1.openai_client is not None
+        assert agent1.openai_client is agent2.openai_client
+        assert agent1.anthropic_client is None
+
+
+def test_provider_clients_share_http_pool():
+    """Test that clients of a provider reuse one HTTP connection pool"""
+    from src.penta_cs_agent import agent as agent_module
+
+    for provider in ("anthropic", "openai"):
+        first = agent_module._get_shared_client(provider, "test-key-1")
+        second = agent_module._get_shared_client(provider, "test-key-2")
+
+        assert first is not second
+        assert first._client is second._client
+        assert first._client is agent_module._get_http_client(provider)
+
+
+def test_http2_clients_use_separate_pool(monkeypatch):
+    """Test that HTTP/2 clients get their own pool built with http2 enabled"""
+    from src.penta_cs_agent import agent as agent_module
+
+    monkeypatch.setattr(agent_module, "_HTTP_CLIENTS", {})
+    monkeypatch.setattr(agent_module, "_CLIENT_CACHE", {})
+    created = []
+
+    class FakeHttpClient:
+        is_closed = False
+
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+
+    monkeypatch.setattr(agent_module.anthropic, "DefaultHttpxClient", FakeHttpClient)
+
+    http1 = agent_module._get_http_client("anthropic")
+    http2 = agent_module._get_http_client("anthropic", http2=True)
+
+    assert http1 is not http2
+    assert agent_module._get_http_client("anthropic", http2=True) is http2
+    assert created == [{"http2": False}, {"http2": True}]
+
+
+def test_clients_use_configured_retries(mock_config):
+    """Test that sync and async clients retry per config.max_retries"""
+    mock_config.max_retries = 5
+    agent = EmailClassificationAgent(config=mock_config)
+
+    client = agent.anthropic_client or agent.openai_client
+    assert client.max_retries == 5
+    assert agent._create_async_client().max_retries == 5
+
+
 def test_agent_with_custom_tools(mock_config):
     """Test agent with custom tool registry"""
     custom_registry = ToolRegistry()
@@ -103,6 +188,633 @@ def test_email_id_generation(mock_config):
     id3 = agent._generate_email_id(email2)
     assert id1 != id3
 
+    # Field boundaries are part of the ID
+    received_at = email.received_at
+    shifted_a = EmailClassification(subject="ab", body="c", received_at=received_at)
+    shifted_b = EmailClassification(subject="a", body="bc", received_at=received_at)
+    assert agent._generate_email_id(shifted_a) != agent._generate_email_id(shifted_b)
+
+
+def test_response_cache_short_circuits_llm(mock_config, temp_data_dir, monkeypatch):
+    """Test that a cached result is returned without calling the LLM again"""
+    mock_config.cache_dir = os.path.join(temp_data_dir, "llm_cache")
+    mock_config.enable_learning = False
+    agent = EmailClassificationAgent(config=mock_config)
+
+    calls = []
+
+    def fake_classify(email, context=None):
+        calls.append(email)
+        return ClassificationResult(
+            primary_category=EmailCategory.QUOTE_REQUEST,
+            confidence=0.9,
+            reasoning="Asking for a price",
+            recommended_action="Route to sales"
+        )
+
+    monkeypatch.setattr(agent, "classify_with_anthropic", fake_classify)
+    monkeypatch.setattr(agent, "classify_with_openai", fake_classify)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", lambda content: {})
+
+    email = EmailClassification(subject="Quote", body="Price for  citric acid", sender="a@b.com")
+    first = agent.classify(email)
+    second = agent.classify(
+        EmailClassification(subject="Quote", body="Price for citric acid", sender="a@b.com")
+    )
+
+    assert len(calls) == 1
+    assert second.primary_category == first.primary_category
+    assert second.reasoning == first.reasoning
+
+
+def test_response_cache_skips_corrupt_entries_and_fallbacks(mock_config, temp_data_dir, monkeypatch):
+    """Test that unreadable cache entries are misses and parse failures are not cached"""
+    mock_config.cache_dir = os.path.join(temp_data_dir, "llm_cache")
+    mock_config.enable_learning = False
+    mock_config.enable_fast_path = False
+    agent = EmailClassificationAgent(config=mock_config)
+
+    replies = ["not json at all", '{"primary_category": "complaint", "confidence": 0.8}']
+    calls = []
+
+    def fake_classify(email, context=None):
+        calls.append(email)
+        return agent._parse_classification_response(replies[len(calls) - 1], email)
+
+    monkeypatch.setattr(agent, "classify_with_anthropic", fake_classify)
+    monkeypatch.setattr(agent, "classify_with_openai", fake_classify)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", lambda content: {})
+
+    email = EmailClassification(subject="Lid", body="Broken")
+    key = agent._generate_cache_key(email)
+    agent.response_cache.set(key, '{"primary_category": "retired_category"}')
+
+    assert agent.classify(email).recommended_action == "Manual review required"
+    assert agent.response_cache.get(key) is None
+
+    assert agent.classify(email).primary_category == EmailCategory.COMPLAINT
+    assert agent.classify(email).primary_category == EmailCategory.COMPLAINT
+    assert len(calls) == 2
+
+    # A parsed reply that happens to recommend manual review is still cached
+    replies.append('{"primary_category": "spam", "recommended_action": "Manual review required"}')
+    other = EmailClassification(subject="Offer", body="Cheap pills")
+    assert agent.classify(other).recommended_action == "Manual review required"
+    assert agent.classify(other).primary_category == EmailCategory.SPAM
+    assert len(calls) == 3
+
+
+def test_fast_path_bypasses_llm(mock_config, monkeypatch):
+    """Test that a confident rule match skips the knowledge base and LLM"""
+    mock_config.enable_fast_path = True
+    agent = EmailClassificationAgent(config=mock_config)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(agent, "classify_with_anthropic", fail)
+    monkeypatch.setattr(agent, "classify_with_openai", fail)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", fail)
+
+    result = agent.classify(
+        EmailClassification(subject="Request for quote - Citric Acid", body="5000 kg please")
+    )
+
+    assert result.primary_category == EmailCategory.QUOTE_REQUEST
+
+
+def test_fast_path_skips_rules_contradicted_by_feedback(mock_config, monkeypatch):
+    """Test that a rule corrected by feedback falls back to the full pipeline"""
+    mock_config.enable_fast_path = True
+    agent = EmailClassificationAgent(config=mock_config)
+    monkeypatch.setattr(agent.knowledge_base, "add_classification_history", lambda **kwargs: None)
+    monkeypatch.setattr(agent.knowledge_base, "add_common_query", lambda **kwargs: None)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", lambda content: {})
+
+    def fake_classify(email, context=None):
+        return ClassificationResult(
+            primary_category=EmailCategory.SAMPLE_REQUEST,
+            confidence=0.9,
+            reasoning="LLM",
+            recommended_action="Route to sales"
+        )
+
+    monkeypatch.setattr(agent, "classify_with_anthropic", fake_classify)
+    monkeypatch.setattr(agent, "classify_with_openai", fake_classify)
+
+    email = EmailClassification(subject="Request for quote - Citric Acid", body="5000 kg please")
+    assert agent.classify(email).reasoning.startswith("Matched rule-based pattern")
+
+    for i in range(5):
+        agent.provide_feedback(
+            email=EmailClassification(subject="Request for quote", body=f"Samples only {i}"),
+            original_classification=EmailCategory.QUOTE_REQUEST,
+            correct_classification=EmailCategory.SAMPLE_REQUEST,
+            confidence=0.95
+        )
+
+    assert agent.classify(email).reasoning == "LLM"
+
+    # A fresh agent rebuilds the tallies from the feedback log
+    fresh = EmailClassificationAgent(config=mock_config)
+    assert fresh._get_rule_feedback()[EmailCategory.QUOTE_REQUEST] == [5, 0]
+
+
+def test_semantic_cache_reuses_near_duplicate(mock_config, monkeypatch):
+    """Test that a near-duplicate past query is reused instead of calling the LLM"""
+    mock_config.enable_semantic_cache = True
+    mock_config.enable_learning = False
+    agent = EmailClassificationAgent(config=mock_config)
+
+    calls = []
+
+    def fake_classify(email, context=None):
+        calls.append(email)
+        return ClassificationResult(
+            primary_category=EmailCategory.GENERAL_INQUIRY,
+            confidence=0.6,
+            reasoning="LLM",
+            recommended_action="Route to support"
+        )
+
+    monkeypatch.setattr(agent, "classify_with_anthropic", fake_classify)
+    monkeypatch.setattr(agent, "classify_with_openai", fake_classify)
+    monkeypatch.setattr(agent.knowledge_base, "search_classification_history",
+                        lambda *args, **kwargs: [])
+
+    def context_at(distance):
+        return lambda content: {"similar_queries": [
+            {"document": "", "metadata": {"classification": "billing_inquiry"}, "distance": distance}
+        ]}
+
+    email = EmailClassification(subject="Invoice", body="Charged twice")
+
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", context_at(0.05))
+    result = agent.classify(email)
+    assert result.primary_category == EmailCategory.BILLING_INQUIRY
+    assert result.confidence == pytest.approx(0.95)
+    assert calls == []
+
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", context_at(0.5))
+    assert agent.classify(email).reasoning == "LLM"
+    assert len(calls) == 1
+
+
+def test_semantic_cache_returns_stored_history_result(mock_config, monkeypatch):
+    """Test that a near-duplicate past email returns its full stored result"""
+    mock_config.enable_semantic_cache = True
+    agent = EmailClassificationAgent(config=mock_config)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("LLM and context lookup should not be called")
+
+    stored = ClassificationResult(
+        primary_category=EmailCategory.SAMPLE_REQUEST,
+        confidence=0.88,
+        reasoning="Asked for samples",
+        recommended_action="Route to sales"
+    )
+    searches = []
+
+    def fake_search(query, n_results=5, where=None):
+        searches.append(where)
+        return [{
+            "document": query,
+            "metadata": {"result_json": stored.model_dump_json()},
+            "distance": 0.02
+        }]
+
+    monkeypatch.setattr(agent, "classify_with_anthropic", fail)
+    monkeypatch.setattr(agent, "classify_with_openai", fail)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", fail)
+    monkeypatch.setattr(agent.knowledge_base, "search_classification_history", fake_search)
+
+    result = agent.classify(EmailClassification(subject="Samples", body="Please send samples"))
+
+    assert result.reasoning == "Asked for samples"
+    assert result.recommended_action == "Route to sales"
+    conditions = searches[0]["$or"][0]["$and"]
+    assert {"cache_namespace": agent._cache_namespace()} in conditions
+    assert {"was_correct": True} in searches[0]["$or"]
+
+    # A result stored under an incompatible schema is a miss, not an error
+    stored_json = '{"primary_category": "retired_category"}'
+    monkeypatch.setattr(agent.knowledge_base, "search_classification_history",
+                        lambda query, n_results=5, where=None: [{
+                            "document": query,
+                            "metadata": {"result_json": stored_json},
+                            "distance": 0.02
+                        }])
+    assert agent.semantic_cache.lookup_history("Samples Please send samples") is None
+
+
+class _LengthEmbeddingFunction:
+    """Deterministic stand-in embedder, so the knowledge base needs no model download"""
+
+    def __call__(self, input):
+        return [[float(len(text)), 1.0, float(text.count("e"))] for text in input]
+
+    def name(self):
+        return "length"
+
+    def get_config(self):
+        return {}
+
+
+def test_feedback_correction_wins_over_stored_result(mock_config, temp_data_dir, monkeypatch):
+    """Test that a corrected email is not served its original result again"""
+    mock_config.enable_semantic_cache = True
+    mock_config.enable_fast_path = False
+    mock_config.cache_dir = os.path.join(temp_data_dir, "llm_cache")
+    knowledge_base = KnowledgeBase(
+        persist_directory=os.path.join(temp_data_dir, "kb"),
+        embedding_function=_LengthEmbeddingFunction()
+    )
+    agent = EmailClassificationAgent(config=mock_config, knowledge_base=knowledge_base)
+
+    calls = []
+
+    def fake_classify(email, context=None):
+        calls.append(email)
+        return ClassificationResult(
+            primary_category=EmailCategory.GENERAL_INQUIRY,
+            confidence=0.6,
+            reasoning="LLM",
+            recommended_action="Route to support"
+        )
+
+    monkeypatch.setattr(agent, "classify_with_anthropic", fake_classify)
+    monkeypatch.setattr(agent, "classify_with_openai", fake_classify)
+
+    email = EmailClassification(subject="Lid", body="The lid arrived broken")
+    first = agent.classify(email)
+    assert first.primary_category == EmailCategory.GENERAL_INQUIRY
+
+    agent.provide_feedback(email, first.primary_category, EmailCategory.COMPLAINT, first.confidence)
+
+    again = agent.classify(email)
+    assert again.primary_category == EmailCategory.COMPLAINT
+    assert len(calls) == 1
+
+
+def test_classify_many_preserves_order_and_errors(mock_config, monkeypatch):
+    """Test concurrent classification returns results in input order"""
+    mock_config.enable_learning = False
+    agent = EmailClassificationAgent(config=mock_config)
+
+    async def fake_aclassify(email, context, client):
+        if email.subject == "boom":
+            raise RuntimeError("API unavailable")
+        return ClassificationResult(
+            primary_category=EmailCategory.GENERAL_INQUIRY,
+            confidence=0.8,
+            reasoning=email.subject,
+            recommended_action="Route to support"
+        )
+
+    monkeypatch.setattr(agent, "_aclassify_with_anthropic", fake_aclassify)
+    monkeypatch.setattr(agent, "_aclassify_with_openai", fake_aclassify)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", lambda content: {})
+
+    emails = [
+        EmailClassification(subject=subject, body="Body")
+        for subject in ["first", "boom", "third"]
+    ]
+    results = agent.classify_many(emails)
+
+    assert results[0].reasoning == "first"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2].reasoning == "third"
+
+
+def test_classify_stream_yields_provisional_then_final(mock_config, monkeypatch):
+    """Test that streaming yields the category early and the full result last"""
+    mock_config.enable_learning = False
+    agent = EmailClassificationAgent(config=mock_config)
+
+    response = (
+        '{"primary_category": "quote_request", "confidence": 0.95, '
+        '"reasoning": "Asking for a price", "recommended_action": "Route to sales"}'
+    )
+    consumed = []
+
+    def fake_stream(email, context=None):
+        for i in range(0, len(response), 8):
+            consumed.append(i)
+            yield response[i:i + 8]
+        return response
+
+    monkeypatch.setattr(agent, "_stream_anthropic", fake_stream)
+    monkeypatch.setattr(agent, "_stream_openai", fake_stream)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", lambda content: {})
+
+    stream = agent.classify_stream(EmailClassification(subject="Quote", body="Citric acid"))
+    provisional = next(stream)
+
+    assert provisional.primary_category == EmailCategory.QUOTE_REQUEST
+    assert provisional.confidence == 0.95
+    assert provisional.reasoning == ""
+    assert len(consumed) < len(range(0, len(response), 8))
+
+    results = list(stream)
+    assert len(results) == 1
+    assert results[0].reasoning == "Asking for a price"
+
+
+def test_classify_stream_stops_when_object_closes(mock_config, monkeypatch):
+    """Test that the stream is closed once the response JSON is complete"""
+    mock_config.enable_learning = False
+    agent = EmailClassificationAgent(config=mock_config)
+    closed = []
+
+    def fake_stream(email, context=None):
+        try:
+            yield '```json\n{"primary_category": "complaint", '
+            yield '"confidence": 0.8, "reasoning": "Says \\"broken {lid}\\""}'
+            yield "\n```\nLet me know if you need anything else."
+            raise AssertionError("Stream should have been closed")
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(agent, "_stream_anthropic", fake_stream)
+    monkeypatch.setattr(agent, "_stream_openai", fake_stream)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", lambda content: {})
+
+    results = list(agent.classify_stream(EmailClassification(subject="Lid", body="Broken")))
+
+    assert closed == [True]
+    assert results[-1].primary_category == EmailCategory.COMPLAINT
+    assert results[-1].reasoning == 'Says "broken {lid}"'
+
+
+def test_classify_stream_skips_braces_before_response(mock_config, monkeypatch):
+    """Test that prose braces and non-response objects do not end the stream early"""
+    mock_config.enable_learning = False
+    agent = EmailClassificationAgent(config=mock_config)
+
+    def fake_stream(email, context=None):
+        yield "Checking the {order_id} field...\n"
+        yield '{"note": "not the answer"}\n'
+        yield '```json\n{"primary_category": "order_inquiry", "confidence": 0.9}\n```'
+        return "unused"
+
+    monkeypatch.setattr(agent, "_stream_anthropic", fake_stream)
+    monkeypatch.setattr(agent, "_stream_openai", fake_stream)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", lambda content: {})
+
+    results = list(agent.classify_stream(EmailClassification(subject="Order", body="Status?")))
+
+    assert results[-1].primary_category == EmailCategory.ORDER_INQUIRY
+    assert results[-1].confidence == 0.9
+
+
+def test_json_object_scanner():
+    """Test that the scanner ignores braces in strings and across chunk splits"""
+    scanner = _JsonObjectScanner()
+    chunks = ['Sure:\n{"a": "}\\', '"{", "b": {"c"', ': 1}}', ' trailing']
+
+    assert [scanner.feed(chunk) for chunk in chunks] == [False, False, True, True]
+    assert scanner.text == '{"a": "}\\"{", "b": {"c": 1}}'
+    assert json.loads(scanner.text) == {"a": '}"{', "b": {"c": 1}}
+
+    unfinished = _JsonObjectScanner()
+    assert unfinished.feed('{"a": 1') is False
+    assert unfinished.text == '{"a": 1'
+
+    # Braces in prose are skipped; an object starts a line or follows a fence
+    prose = _JsonObjectScanner()
+    assert prose.feed('Checking the {order_id} field... ``') is False
+    assert prose.feed('`json {"a": 1}') is True
+    assert prose.text == '{"a": 1}'
+
+    example = _JsonObjectScanner()
+    assert example.feed('{"example": true}\n{"a": 1}') is True
+    assert example.text == '{"example": true}'
+    assert example.resume() is True
+    assert example.text == '{"a": 1}'
+
+
+def test_parse_classification_response(mock_config):
+    """Test parsing fenced, minimal and invalid LLM responses"""
+    agent = EmailClassificationAgent(config=mock_config)
+    email = EmailClassification(subject="Test", body="Test body")
+
+    result = agent._parse_classification_response(
+        'Here you go:\n```json\n{"primary_category": "complaint", "confidence": 0.8, '
+        '"secondary_categories": ["billing_inquiry"], "priority": "high"}\n```',
+        email
+    )
+    assert result.primary_category == EmailCategory.COMPLAINT
+    assert result.secondary_categories == [EmailCategory.BILLING_INQUIRY]
+    assert result.priority == "high"
+    assert result.reasoning == ""
+
+    minimal = agent._parse_classification_response('{"primary_category": "spam"}', email)
+    assert minimal.confidence == 0.5
+
+    unfenced = agent._parse_classification_response(
+        'Classification: {"primary_category": "spam", "extracted_entities": {"a": "b"}} Done.',
+        email
+    )
+    assert unfenced.primary_category == EmailCategory.SPAM
+    assert unfenced.extracted_entities == {"a": "b"}
+
+    prose_brace = agent._parse_classification_response(
+        'I checked the {order} details.\n```json\n'
+        '{"primary_category": "order_inquiry", "confidence": 0.9}\n```\nLet me know.',
+        email
+    )
+    assert prose_brace.primary_category == EmailCategory.ORDER_INQUIRY
+    assert prose_brace.confidence == 0.9
+
+    fallback = agent._parse_classification_response('{"primary_category": "unknown"}', email)
+    assert fallback.primary_category == EmailCategory.GENERAL_INQUIRY
+    assert fallback.recommended_action == "Manual review required"
+
+    out_of_range = agent._parse_classification_response(
+        '{"primary_category": "spam", "confidence": 1.5}', email
+    )
+    assert out_of_range.recommended_action == "Manual review required"
+
+    # Results built without validation still serialize like validated ones
+    assert ClassificationResult.model_validate_json(result.model_dump_json()) == result
+
+
+def test_parse_classification_response_normalizes_priority(mock_config):
+    """Test that LLM priorities are mapped onto the allowed levels"""
+    agent = EmailClassificationAgent(config=mock_config)
+    email = EmailClassification(subject="Test", body="Test body")
+
+    def priority_of(value):
+        response = f'{{"primary_category": "spam", "priority": "{value}"}}'
+        return agent._parse_classification_response(response, email).priority
+
+    assert priority_of(" Urgent ") == "urgent"
+    assert priority_of("critical") == "normal"
+    assert priority_of("HIGH") in PRIORITY_LEVELS
+
+
+def test_partial_classification_waits_for_complete_fields(mock_config):
+    """Test that provisional parsing ignores incomplete or invalid fields"""
+    agent = EmailClassificationAgent(config=mock_config)
+
+    assert agent._parse_partial_classification('{"primary_category": "quote_req') is None
+    assert agent._parse_partial_classification(
+        '{"primary_category": "quote_request", "confidence": 0.9'
+    ) is None
+    assert agent._parse_partial_classification(
+        '{"primary_category": "not_a_category", "confidence": 0.9,'
+    ) is None
+    assert agent._parse_partial_classification(
+        '{"primary_category": "spam", "confidence": 0.9,'
+    ).primary_category == EmailCategory.SPAM
+
+
+def _batch_response(category):
+    return (
+        f'{{"primary_category": "{category}", "confidence": 0.9, '
+        '"reasoning": "Batched", "recommended_action": "Route"}'
+    )
+
+
+def test_classify_batch_anthropic(mock_config, monkeypatch):
+    """Test Anthropic batch results map back in order, with tool-use fallback"""
+    mock_config.llm_provider = "anthropic"
+    mock_config.anthropic_api_key = "test-key"
+    mock_config.batch_poll_interval = 0
+    mock_config.enable_learning = False
+    agent = EmailClassificationAgent(config=mock_config)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", lambda content: {})
+
+    submitted = []
+
+    def message(stop_reason, text=""):
+        return SimpleNamespace(stop_reason=stop_reason,
+                               content=[SimpleNamespace(type="text", text=text)])
+
+    def results(batch_id):
+        return [
+            SimpleNamespace(custom_id="0", result=SimpleNamespace(
+                type="succeeded", message=message("end_turn", _batch_response("quote_request")))),
+            SimpleNamespace(custom_id="1", result=SimpleNamespace(
+                type="succeeded", message=message("tool_use"))),
+            SimpleNamespace(custom_id="2", result=SimpleNamespace(type="errored", error="overloaded")),
+        ]
+
+    statuses = iter(["in_progress", "ended"])
+    batches = SimpleNamespace(
+        create=lambda requests: submitted.extend(requests) or SimpleNamespace(
+            id="b1", processing_status="in_progress"),
+        retrieve=lambda batch_id: SimpleNamespace(id=batch_id, processing_status=next(statuses)),
+        results=results
+    )
+    agent.__dict__["anthropic_client"] = SimpleNamespace(messages=SimpleNamespace(batches=batches))
+    monkeypatch.setattr(agent, "classify_with_anthropic", lambda email, context=None: ClassificationResult(
+        primary_category=EmailCategory.ORDER_INQUIRY, confidence=0.8,
+        reasoning="Interactive", recommended_action="Route"))
+
+    emails = [EmailClassification(subject=f"Email {i}", body="Body") for i in range(3)]
+    results = agent.classify_batch(emails)
+
+    assert [request["custom_id"] for request in submitted] == ["0", "1", "2"]
+    assert results[0].primary_category == EmailCategory.QUOTE_REQUEST
+    assert results[1].reasoning == "Interactive"
+    assert isinstance(results[2], RuntimeError)
+
+
+def test_classify_batch_openai(mock_config, monkeypatch):
+    """Test OpenAI batch input file and output parsing"""
+    mock_config.llm_provider = "openai"
+    mock_config.openai_api_key = "test-key"
+    mock_config.batch_poll_interval = 0
+    mock_config.enable_learning = False
+    agent = EmailClassificationAgent(config=mock_config)
+    monkeypatch.setattr(agent.knowledge_base, "get_context_for_classification", lambda content: {})
+
+    uploaded = {}
+
+    def create_file(file, purpose):
+        uploaded["lines"] = [json.loads(line) for line in file[1].splitlines()]
+        return SimpleNamespace(id="file-in")
+
+    output = "\n".join([
+        json.dumps({"custom_id": "1", "response": {"status_code": 200, "body": {
+            "choices": [{"message": {"content": _batch_response("spam")}}]}}}),
+        json.dumps({"custom_id": "0", "response": {"status_code": 200, "body": {
+            "choices": [{"message": {"content": _batch_response("complaint")}}]}}}),
+    ])
+    agent.__dict__["openai_client"] = SimpleNamespace(
+        files=SimpleNamespace(create=create_file,
+                              content=lambda file_id: SimpleNamespace(text=output)),
+        batches=SimpleNamespace(
+            create=lambda **kwargs: SimpleNamespace(id="b1", status="validating"),
+            retrieve=lambda batch_id: SimpleNamespace(
+                id=batch_id, status="completed", output_file_id="file-out", error_file_id=None)
+        )
+    )
+
+    emails = [EmailClassification(subject=f"Email {i}", body="Body") for i in range(2)]
+    results = agent.classify_batch(emails)
+
+    assert uploaded["lines"][0]["url"] == "/v1/chat/completions"
+    assert uploaded["lines"][0]["body"]["model"] == mock_config.openai_model
+    assert results[0].primary_category == EmailCategory.COMPLAINT
+    assert results[1].primary_category == EmailCategory.SPAM
+
+
+def test_async_classify_runs_tools_off_event_loop(mock_config):
+    """Test that the async provider paths run tool calls in worker threads"""
+    registry = ToolRegistry()
+    tool_threads = []
+
+    @registry.register_decorator(
+        name="lookup_order",
+        description="Look up an order",
+        parameters={"type": "object", "properties": {"order_id": {"type": "string"}}}
+    )
+    def lookup_order(order_id):
+        tool_threads.append(threading.get_ident())
+        return {"order_id": order_id, "status": "shipped"}
+
+    agent = EmailClassificationAgent(config=mock_config, tool_registry=registry)
+    email = EmailClassification(subject="Where is my order?", body="Order 123")
+    requests = []
+
+    async def anthropic_create(**request):
+        requests.append(request)
+        if len(requests) == 1:
+            return SimpleNamespace(stop_reason="tool_use", content=[SimpleNamespace(
+                type="tool_use", id="t1", name="lookup_order", input={"order_id": "123"})])
+        return SimpleNamespace(stop_reason="end_turn", content=[
+            SimpleNamespace(type="text", text=_batch_response("order_inquiry"))])
+
+    async def openai_create(**request):
+        requests.append(request)
+        if len(requests) == 1:
+            tool_call = SimpleNamespace(id="c1", function=SimpleNamespace(
+                name="lookup_order", arguments='{"order_id": "123"}'))
+            message = SimpleNamespace(tool_calls=[tool_call], content=None)
+        else:
+            message = SimpleNamespace(tool_calls=None, content=_batch_response("order_inquiry"))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def run(classify, client):
+        requests.clear()
+        return threading.get_ident(), await classify(email, {}, client)
+
+    loop_thread, result = asyncio.run(run(agent._aclassify_with_anthropic, SimpleNamespace(
+        messages=SimpleNamespace(create=anthropic_create))))
+    assert result.primary_category == EmailCategory.ORDER_INQUIRY
+    assert tool_threads[-1] != loop_thread
+    assert '"status":"shipped"' in requests[1]["messages"][2]["content"][0]["content"]
+
+    loop_thread, result = asyncio.run(run(agent._aclassify_with_openai, SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=openai_create)))))
+    assert result.primary_category == EmailCategory.ORDER_INQUIRY
+    assert tool_threads[-1] != loop_thread
+    assert '"status":"shipped"' in requests[1]["messages"][-1]["content"]
+    assert len(tool_threads) == 2
+
 
 @pytest.mark.skipif(
     not os.getenv("ANTHROPIC_API_KEY") and not os.getenv("OPENAI_API_KEY"),
@@ -164,6 +876,65 @@ def test_feedback_mechanism(mock_config, temp_data_dir):
     assert kb_stats["total_queries"] > 0
 
 
+def test_feedback_log_appends_entries(mock_config):
+    """Test that feedback entries accumulate in the log file"""
+    agent = EmailClassificationAgent(config=mock_config)
+
+    for notes in ["first", "second"]:
+        agent._save_feedback(FeedbackEntry(
+            email_id="abc",
+            original_classification=EmailCategory.GENERAL_INQUIRY,
+            correct_classification=EmailCategory.COMPLAINT,
+            confidence=0.7,
+            email_content="Test body",
+            notes=notes
+        ))
+
+    with open(mock_config.feedback_log_path) as f:
+        entries = [json.loads(line) for line in f]
+
+    assert [entry["notes"] for entry in entries] == ["first", "second"]
+    assert FeedbackEntry(**entries[0]).correct_classification == EmailCategory.COMPLAINT
+
+
+def test_read_feedback_skips_truncated_lines(mock_config):
+    """Test that read_feedback yields entries and skips a partial last line"""
+    agent = EmailClassificationAgent(config=mock_config)
+    assert list(agent.read_feedback()) == []
+
+    agent._save_feedback(FeedbackEntry(
+        email_id="abc",
+        original_classification=EmailCategory.GENERAL_INQUIRY,
+        correct_classification=EmailCategory.COMPLAINT,
+        confidence=0.7,
+        email_content="Test body"
+    ))
+    with open(mock_config.feedback_log_path, "a") as f:
+        f.write('{"email_id": "trunc')
+
+    entries = list(agent.read_feedback())
+    assert len(entries) == 1
+    assert entries[0].email_id == "abc"
+
+
+def test_read_feedback_accepts_legacy_array_log(mock_config):
+    """Test that a feedback log in the old JSON array format is still read"""
+    agent = EmailClassificationAgent(config=mock_config)
+    os.makedirs(os.path.dirname(mock_config.feedback_log_path), exist_ok=True)
+    entries = [
+        {"email_id": "old", "original_classification": "general_inquiry",
+         "correct_classification": "complaint", "confidence": 0.7,
+         "email_content": "Test body", "feedback_timestamp": "2024-05-01T09:30:15"}
+    ]
+    with open(mock_config.feedback_log_path, "w") as f:
+        json.dump(entries, f, indent=2)
+
+    feedback = list(agent.read_feedback())
+
+    assert [entry.email_id for entry in feedback] == ["old"]
+    assert feedback[0].correct_classification == EmailCategory.COMPLAINT
+
+
 def test_system_prompt_generation(mock_config):
     """Test system prompt generation"""
     agent = EmailClassificationAgent(config=mock_config)
@@ -174,6 +945,75 @@ def test_system_prompt_generation(mock_config):
     assert "quote_request" in prompt
 
 
+def test_static_system_prompt_built_once(mock_config, monkeypatch):
+    """Test that the static prompt is computed at init and reused"""
+    agent = EmailClassificationAgent(config=mock_config)
+
+    def fail():
+        raise AssertionError("Static prompt should not be rebuilt")
+
+    monkeypatch.setattr(agent, "_build_static_system_prompt", fail)
+    monkeypatch.setattr(agent, "_get_categories_description", fail)
+
+    assert agent._get_system_prompt() is agent._get_static_system_prompt()
+    assert agent._get_anthropic_system()[0]["text"] is agent._get_static_system_prompt()
+
+
+def test_classification_prompt_truncates_long_body(mock_config, monkeypatch):
+    """Test that the body is cut to max_body_tokens in the prompt"""
+    from src.penta_cs_agent import tokens
+
+    monkeypatch.setattr(tokens, "truncate_to_tokens", lambda text, limit: text[:limit])
+    mock_config.max_body_tokens = 10
+    agent = EmailClassificationAgent(config=mock_config)
+
+    prompt = agent._create_classification_prompt(
+        EmailClassification(subject="Test", body="0123456789" + "x" * 50)
+    )
+
+    assert "Body:\n0123456789\n" in prompt
+
+
+def test_format_context(mock_config):
+    """Test the knowledge base context section of the prompt"""
+    agent = EmailClassificationAgent(config=mock_config)
+    context = {
+        "similar_queries": [
+            {"metadata": {"classification": "quote_request", "confidence": 0.9}},
+            {"metadata": {"classification": "sample_request"}},
+            {"metadata": {"classification": "complaint", "confidence": 0.5}},
+        ],
+        "relevant_products": [{"metadata": {"name": "Citric Acid"}}],
+    }
+
+    assert agent._format_context(context) == (
+        "Similar past queries:\n"
+        "  - Category: quote_request (confidence: 0.90)\n"
+        "  - Category: sample_request (confidence: 0.00)\n"
+        "\nRelevant products:\n"
+        "  - Citric Acid"
+    )
+    assert agent._format_context({"similar_queries": [], "relevant_products": []}) == ""
+
+
+def test_anthropic_system_blocks_mark_static_prefix(mock_config):
+    """Test that only the static system block carries a cache breakpoint"""
+    agent = EmailClassificationAgent(config=mock_config)
+    context = {
+        "similar_queries": [{"metadata": {"classification": "quote_request", "confidence": 0.9}}],
+        "relevant_products": [],
+    }
+
+    blocks = agent._get_anthropic_system(context)
+
+    assert blocks[0]["text"] == agent._get_static_system_prompt()
+    assert blocks[0]["cache_control"] == {"type": "ephemeral"}
+    assert len(blocks) == 2
+    assert "cache_control" not in blocks[1]
+    assert "quote_request" in blocks[1]["text"]
+    assert agent._get_system_prompt(context).startswith(blocks[0]["text"])
+
+
 def test_classification_prompt_generation(mock_config):
     """Test classification prompt generation"""
     agent = EmailClassificationAgent(config=mock_config)
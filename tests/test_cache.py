@@ -0,0 +1,55 @@
+"""
+Tests for the on-disk response cache
+"""
+
+import pytest
+import tempfile
+import shutil
+from src.penta_cs_agent.cache import DiskCache
+
+
+@pytest.fixture
+def temp_cache_dir():
+    """Create temporary cache directory"""
+    temp_dir = tempfile.mkdtemp()
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_cache_set_and_get(temp_cache_dir):
+    """Test storing and retrieving a value"""
+    cache = DiskCache(temp_cache_dir)
+    cache.set("key", "value")
+
+    assert cache.get("key") == "value"
+    assert cache.get("missing") is None
+    assert len(cache) == 1
+
+
+def test_cache_persists_across_instances(temp_cache_dir):
+    """Test that entries survive reopening the cache"""
+    cache = DiskCache(temp_cache_dir)
+    cache.set("key", "value")
+    cache.close()
+
+    reopened = DiskCache(temp_cache_dir)
+    assert reopened.get("key") == "value"
+
+
+def test_cache_ttl_expiry(temp_cache_dir):
+    """Test that expired entries are not returned"""
+    cache = DiskCache(temp_cache_dir, ttl=-1)
+    cache.set("key", "value")
+
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_cache_clear(temp_cache_dir):
+    """Test clearing the cache"""
+    cache = DiskCache(temp_cache_dir)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.clear()
+
+    assert len(cache) == 0
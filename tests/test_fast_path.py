@@ -0,0 +1,44 @@
+"""
+Tests for rule-based fast-path classification
+"""
+
+import pytest
+from src.penta_cs_agent.fast_path import try_classify
+from src.penta_cs_agent.models import EmailCategory, EmailClassification
+
+
+@pytest.mark.parametrize("subject, expected", [
+    ("Request for quote - Citric Acid", EmailCategory.QUOTE_REQUEST),
+    ("Sample request for testing", EmailCategory.SAMPLE_REQUEST),
+    ("Order #12345 - Shipping Status?", EmailCategory.ORDER_INQUIRY),
+    ("SDS request for sodium benzoate", EmailCategory.REGULATORY_COMPLIANCE),
+])
+def test_fast_path_matches_obvious_subjects(subject, expected):
+    """Test that unambiguous subjects are classified by rule"""
+    result = try_classify(EmailClassification(subject=subject, body=""))
+
+    assert result is not None
+    assert result.primary_category == expected
+    assert result.confidence >= 0.9
+    assert result.recommended_action != ""
+
+
+def test_fast_path_no_match():
+    """Test that ambiguous emails fall through to the LLM"""
+    email = EmailClassification(
+        subject="Question about Ascorbic Acid specifications",
+        body="Can you provide information about purity levels?"
+    )
+
+    assert try_classify(email) is None
+
+
+def test_fast_path_prefers_highest_confidence_rule():
+    """Test that the strongest matching rule wins"""
+    email = EmailClassification(
+        subject="Invoice #INV-2024-001",
+        body="Please also send a quote request form for citric acid."
+    )
+
+    result = try_classify(email)
+    assert result.primary_category == EmailCategory.QUOTE_REQUEST
@@ -2,20 +2,27 @@
 Tests for knowledge base
 """
 
+import json
 import pytest
 import tempfile
 import shutil
-from src.penta_cs_agent.knowledge_base import KnowledgeBase
+from src.penta_cs_agent.cache import DiskCache
+from src.penta_cs_agent.knowledge_base import KnowledgeBase, EmbeddingCache
 
 
 @pytest.fixture
-def temp_kb():
-    """Create a temporary knowledge base for testing"""
-    temp_dir = tempfile.mkdtemp()
-    kb = KnowledgeBase(persist_directory=temp_dir)
-    yield kb
+def temp_dir():
+    """Create a temporary directory for knowledge base storage"""
+    path = tempfile.mkdtemp()
+    yield path
     # Cleanup
-    shutil.rmtree(temp_dir, ignore_errors=True)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def temp_kb(temp_dir):
+    """Create a temporary knowledge base for testing"""
+    return KnowledgeBase(persist_directory=temp_dir)
 
 
 def test_knowledge_base_creation(temp_kb):
@@ -27,6 +34,14 @@ def test_knowledge_base_creation(temp_kb):
     assert stats["total_history"] == 0
 
 
+def test_collections_use_cosine_distance(temp_kb):
+    """Test that all collections rank results by cosine distance"""
+    for collection in (temp_kb.products_collection,
+                       temp_kb.queries_collection,
+                       temp_kb.history_collection):
+        assert collection.metadata["hnsw:space"] == "cosine"
+
+
 def test_add_product(temp_kb):
     """Test adding a product to knowledge base"""
     temp_kb.add_product(
@@ -154,3 +169,297 @@ def test_get_context_for_classification(temp_kb):
     assert "similar_queries" in context
     assert "relevant_products" in context
     assert "similar_history" in context
+
+
+class CountingEmbeddingFunction:
+    """Deterministic stand-in embedder that records every batch it embeds"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, input):
+        self.calls.append(list(input))
+        return [[float(len(text)), 1.0, float(text.count("a"))] for text in input]
+
+    def name(self):
+        return "counting"
+
+    def get_config(self):
+        return {}
+
+
+def test_embedding_cache_memoizes():
+    """Test that repeated texts are embedded only once"""
+    inner = CountingEmbeddingFunction()
+    cache = EmbeddingCache(inner)
+
+    first = cache.embed(["citric acid", "sodium benzoate"])
+    second = cache.embed(["citric acid", "citric acid", "new text"])
+
+    assert inner.calls == [["citric acid", "sodium benzoate"], ["new text"]]
+    assert list(first[0]) == list(second[0]) == list(second[1])
+
+
+def test_embedding_cache_accepts_embedders_without_name():
+    """Test that legacy embedders that only define __call__ can be cached"""
+    class LegacyEmbeddingFunction:
+        def __call__(self, input):
+            return [[float(len(text)), 1.0] for text in input]
+
+    cache = EmbeddingCache(LegacyEmbeddingFunction())
+
+    assert list(cache.embed(["citric acid"])[0]) == [11.0, 1.0]
+    assert cache._model_name == "test_embedding_cache_accepts_embedders_without_name.<locals>.LegacyEmbeddingFunction"
+
+
+def test_embedding_cache_persists():
+    """Test that vectors are reloaded from the persistent cache"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        inner = CountingEmbeddingFunction()
+        EmbeddingCache(inner, cache=DiskCache(temp_dir)).embed(["citric acid"])
+
+        fresh_inner = CountingEmbeddingFunction()
+        vectors = EmbeddingCache(fresh_inner, cache=DiskCache(temp_dir)).embed(["citric acid"])
+
+        assert fresh_inner.calls == []
+        assert list(vectors[0]) == [11.0, 1.0, 1.0]
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def test_add_products_bulk_embeds_once(temp_kb):
+    """Test that bulk product insertion embeds all documents in one batch"""
+    embedder = CountingEmbeddingFunction()
+    temp_kb.embedding_cache.embedding_function = embedder
+
+    temp_kb.add_products_bulk([
+        {"product_id": "P1", "name": "Product 1", "description": "Description 1", "category": "Cat1"},
+        {"product_id": "P2", "name": "Product 2", "description": "Description 2", "category": "Cat2",
+         "metadata": {"cas": "77-92-9"}},
+        {"product_id": "P3", "name": "Product 3", "description": "Description 3", "category": "Cat3"},
+    ])
+
+    assert len(embedder.calls) == 1
+    assert len(embedder.calls[0]) == 3
+    assert temp_kb.get_stats()["total_products"] == 3
+
+
+def test_bulk_add_skips_existing_ids(temp_kb):
+    """Test that re-running a bulk load does not re-embed stored entries"""
+    products = [
+        {"product_id": "P1", "name": "Product 1", "description": "Description 1", "category": "Cat1"},
+    ]
+    temp_kb.embedding_cache = EmbeddingCache(CountingEmbeddingFunction())
+    temp_kb.add_products_bulk(products)
+
+    # A fresh, empty embedding cache, as in a new process without one
+    embedder = CountingEmbeddingFunction()
+    temp_kb.embedding_cache = EmbeddingCache(embedder)
+    temp_kb.add_products_bulk(products + [
+        {"product_id": "P2", "name": "Product 2", "description": "Description 2", "category": "Cat2"},
+    ])
+
+    assert embedder.calls == [["Product 2: Description 2"]]
+    assert temp_kb.get_stats()["total_products"] == 2
+
+
+def test_bulk_add_dedupes_ids_within_batch(temp_kb):
+    """Test that a batch repeating an id is stored once, with its last occurrence"""
+    temp_kb.embedding_cache = EmbeddingCache(CountingEmbeddingFunction())
+
+    temp_kb.add_products_bulk([
+        {"product_id": "P1", "name": "Old name", "description": "Draft", "category": "Cat1"},
+        {"product_id": "P1", "name": "Product 1", "description": "Description 1", "category": "Cat1"},
+    ])
+    temp_kb.add_common_queries_bulk([
+        {"query_id": "Q1", "query_text": "price quote", "classification": "quote_request", "confidence": 0.9},
+        {"query_id": "Q1", "query_text": "price quote", "classification": "quote_request", "confidence": 0.9},
+    ])
+
+    stats = temp_kb.get_stats()
+    assert stats["total_products"] == 1
+    assert stats["total_queries"] == 1
+    assert temp_kb.products_collection.get(ids=["P1"])["metadatas"][0]["name"] == "Product 1"
+
+
+def test_classification_history_metadata_and_filter(temp_kb):
+    """Test that history accepts None/dict metadata and can be filtered"""
+    temp_kb.embedding_cache.embedding_function = CountingEmbeddingFunction()
+
+    temp_kb.add_classification_history(
+        email_id="e1",
+        email_content="Need samples of citric acid",
+        classification="sample_request",
+        confidence=0.9,
+        metadata={"sender": None, "extracted_entities": {"product_names": ["Citric Acid"]},
+                  "cache_namespace": "anthropic:model"}
+    )
+
+    hits = temp_kb.search_classification_history(
+        "Need samples of citric acid", n_results=1,
+        where={"cache_namespace": "anthropic:model"}
+    )
+    assert hits[0]["metadata"]["email_id"] == "e1"
+    assert "sender" not in hits[0]["metadata"]
+    assert json.loads(hits[0]["metadata"]["extracted_entities"]) == {"product_names": ["Citric Acid"]}
+
+    assert temp_kb.search_classification_history(
+        "Need samples of citric acid", n_results=1,
+        where={"cache_namespace": "openai:model"}
+    ) == []
+
+
+def test_context_embeds_email_once(temp_kb):
+    """Test that the three context lookups share one embedding"""
+    temp_kb.embedding_cache.embedding_function = CountingEmbeddingFunction()
+    temp_kb.add_product("P1", "Citric Acid", "Food-grade acidulant", "Acidulants")
+    temp_kb.add_common_query("Q1", "Price for citric acid", "quote_request", 0.9)
+
+    embedded = []
+    embed = temp_kb.embedding_cache.embed
+    temp_kb.embedding_cache.embed = lambda texts: embedded.append(texts) or embed(texts)
+
+    context = temp_kb.get_context_for_classification("Citric acid quote")
+
+    assert embedded == [["Citric acid quote"]]
+    assert context["relevant_products"][0]["metadata"]["name"] == "Citric Acid"
+    assert context["similar_queries"][0]["metadata"]["query_id"] == "Q1"
+    assert context["similar_history"] == []
+
+
+def test_add_common_queries_bulk(temp_kb):
+    """Test bulk insertion of common queries"""
+    temp_kb.embedding_cache.embedding_function = CountingEmbeddingFunction()
+
+    temp_kb.add_common_queries_bulk([
+        {"query_id": "Q1", "query_text": "price quote", "classification": "quote_request", "confidence": 0.9},
+        {"query_id": "Q2", "query_text": "where is my order", "classification": "order_inquiry", "confidence": 0.9},
+    ])
+
+    assert temp_kb.get_stats()["total_queries"] == 2
+
+
+def test_classification_history_is_written_in_batches(temp_kb):
+    """Test that history entries are buffered and embedded in one batch"""
+    embedder = CountingEmbeddingFunction()
+    temp_kb.embedding_cache = EmbeddingCache(embedder)
+    temp_kb.history_flush_size = 3
+
+    temp_kb.add_classification_history("E1", "need a quote", "quote_request", 0.9)
+    temp_kb.add_classification_history("E1", "need a quote", "quote_request", 0.9)
+    assert embedder.calls == []
+
+    temp_kb.add_classification_history("E2", "where is my order", "order_inquiry", 0.8)
+    assert embedder.calls == [["need a quote", "where is my order"]]
+
+    # Reads see entries that have not reached the threshold yet
+    temp_kb.add_classification_history("E3", "invoice is wrong", "billing_inquiry", 0.8)
+    assert temp_kb.get_stats()["total_history"] == 3
+
+
+def test_history_search_merges_pending_without_flushing(temp_kb):
+    """Test that searches see buffered history without writing it out"""
+    temp_kb.embedding_cache.embedding_function = CountingEmbeddingFunction()
+    temp_kb.history_flush_size = 50
+    namespace = {"cache_namespace": "anthropic:model"}
+
+    temp_kb.add_classification_history("E1", "need a quote", "quote_request", 0.9, metadata=namespace)
+    temp_kb.add_classification_history("E2", "where is my order", "order_inquiry", 0.8)
+
+    hits = temp_kb.search_classification_history(
+        "need a quote", n_results=1,
+        where={"$and": [namespace, {"created_at": {"$gte": 0}}]}
+    )
+    assert hits[0]["metadata"]["email_id"] == "E1"
+    assert hits[0]["distance"] == pytest.approx(0.0)
+    assert temp_kb.search_classification_history(
+        "where is my order", n_results=1, where=namespace
+    )[0]["metadata"]["email_id"] == "E1"
+
+    context = temp_kb.get_context_for_classification("where is my order")
+    assert context["similar_history"][0]["metadata"]["email_id"] == "E2"
+    assert temp_kb.history_collection.count() == 0
+
+    temp_kb.flush_history()
+    assert temp_kb.search_classification_history("need a quote", n_results=1)[0]["metadata"]["email_id"] == "E1"
+    assert len(temp_kb.search_classification_history("need a quote", n_results=5)) == 2
+
+
+def test_history_search_survives_failed_flush(temp_kb, monkeypatch):
+    """Test that a failed write for an unsupported filter does not break the search"""
+    temp_kb.embedding_cache.embedding_function = CountingEmbeddingFunction()
+    temp_kb.add_classification_history("E1", "need a quote", "quote_request", 0.9)
+
+    def fail_add(**kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(temp_kb.history_collection, "add", fail_add)
+
+    hits = temp_kb.search_classification_history(
+        "need a quote", where={"classification": {"$in": ["quote_request"]}}
+    )
+
+    assert hits == []
+    assert len(temp_kb._pending_history) == 1
+
+
+def test_custom_embedding_function(temp_dir):
+    """Test that a supplied embedder is used for documents and queries"""
+    embedder = CountingEmbeddingFunction()
+    kb = KnowledgeBase(persist_directory=temp_dir, embedding_function=embedder)
+    kb.add_product("P1", "Citric Acid", "Food-grade acidulant", "Acidulants")
+
+    results = kb.search_products("citric acid", n_results=1)
+
+    assert results[0]["metadata"]["product_id"] == "P1"
+    assert embedder.calls == [["Citric Acid: Food-grade acidulant"], ["citric acid"]]
+
+
+def test_context_is_cached_until_write(temp_kb):
+    """Test that repeated context lookups are served from memory until a write"""
+    temp_kb.embedding_cache.embedding_function = CountingEmbeddingFunction()
+    temp_kb.add_product("P1", "Citric Acid", "Food-grade acidulant", "Acidulants")
+
+    queries = []
+    query = temp_kb._query
+    temp_kb._query = lambda *args, **kwargs: queries.append(args[3]) or query(*args, **kwargs)
+
+    first = temp_kb.get_context_for_classification("Citric acid quote")
+    first["relevant_products"].clear()
+    second = temp_kb.get_context_for_classification("Citric acid quote")
+    assert queries == ["queries", "products", "history", "history"]
+    assert second["relevant_products"][0]["metadata"]["name"] == "Citric Acid"
+
+    temp_kb.add_common_query("Q1", "Price for citric acid", "quote_request", 0.9)
+    third = temp_kb.get_context_for_classification("Citric acid quote")
+    assert len(queries) == 7
+    assert third["similar_queries"][0]["metadata"]["query_id"] == "Q1"
+
+    temp_kb.context_cache_ttl = -1
+    temp_kb.get_context_for_classification("Citric acid quote")
+    assert len(queries) == 10
+
+
+def test_context_cache_survives_history_writes(temp_kb):
+    """Test that recording history between reads keeps the cached context and shows the new history"""
+    temp_kb.embedding_cache.embedding_function = CountingEmbeddingFunction()
+    temp_kb.history_flush_size = 1
+    temp_kb.add_product("P1", "Citric Acid", "Food-grade acidulant", "Acidulants")
+
+    queries = []
+    query = temp_kb._query
+    temp_kb._query = lambda *args, **kwargs: queries.append(args[3]) or query(*args, **kwargs)
+
+    emails = ["Citric acid quote", "Where is my order"]
+    for round_number in range(2):
+        for i, email in enumerate(emails):
+            context = temp_kb.get_context_for_classification(email)
+            assert context["relevant_products"][0]["metadata"]["name"] == "Citric Acid"
+            temp_kb.add_classification_history(f"E{round_number}{i}", email, "quote_request", 0.9)
+
+    # Products and queries were looked up once per email; history every read
+    assert queries.count("products") == queries.count("queries") == 2
+    assert queries.count("history") == 4
+    assert temp_kb.history_collection.count() == 4
+    assert context["similar_history"][0]["document"] == "Where is my order"
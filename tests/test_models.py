@@ -4,6 +4,7 @@ Tests for data models
 
 import pytest
 from datetime import datetime
+from pydantic import ValidationError
 from src.penta_cs_agent.models import (
     EmailCategory,
     EmailClassification,
@@ -25,6 +26,11 @@ def test_email_category_descriptions():
     assert "quote" in desc.lower()
     assert "price" in desc.lower()
 
+    # Every category has a description, and the enum gained no members
+    assert len(EmailCategory) == 12
+    assert all(EmailCategory.get_description(c) != "Unknown category" for c in EmailCategory)
+    assert EmailCategory.get_description("not_a_category") == "Unknown category"
+
 
 def test_email_classification_creation():
     """Test creating EmailClassification"""
@@ -51,6 +57,22 @@ def test_email_classification_without_sender():
     assert email.metadata == {}
 
 
+def test_email_batch_validation():
+    """Test validating a batch of raw emails at once"""
+    emails = EmailClassification.validate_batch([
+        {"subject": "First", "body": "Body 1", "sender": "a@example.com"},
+        {"subject": "Second", "body": "Body 2"},
+    ])
+    assert [email.subject for email in emails] == ["First", "Second"]
+    assert emails[1].sender is None
+
+    from_json = EmailClassification.validate_batch(b'[{"subject": "Third", "body": "Body 3"}]')
+    assert from_json[0].subject == "Third"
+
+    with pytest.raises(ValidationError):
+        EmailClassification.validate_batch([{"subject": "Missing body"}])
+
+
 def test_classification_result_creation():
     """Test creating ClassificationResult"""
     result = ClassificationResult(
@@ -117,3 +139,42 @@ def test_confidence_score_validation():
             reasoning="Test",
             recommended_action="Test"
         )
+
+
+def test_result_json_round_trip():
+    """Test that timestamps serialize as ISO 8601 and survive a round trip"""
+    timestamp = datetime(2024, 5, 1, 9, 30, 15)
+    result = ClassificationResult(
+        primary_category=EmailCategory.COMPLAINT,
+        confidence=0.8,
+        reasoning="Broken lid",
+        recommended_action="Route to quality",
+        timestamp=timestamp,
+        unexpected_field="ignored"
+    )
+
+    payload = result.model_dump_json()
+
+    assert '"timestamp":"2024-05-01T09:30:15"' in payload
+    assert "unexpected_field" not in payload
+    assert ClassificationResult.model_validate_json(payload) == result
+
+
+def test_models_are_frozen():
+    """Test that models cannot be changed after construction"""
+    email = EmailClassification(subject="Test", body="Body")
+    result = ClassificationResult(
+        primary_category=EmailCategory.SPAM,
+        confidence=0.9,
+        reasoning="Test",
+        recommended_action="Archive"
+    )
+
+    with pytest.raises(ValidationError):
+        email.subject = "Changed"
+    with pytest.raises(ValidationError):
+        result.priority = "high"
+
+    updated = result.model_copy(update={"priority": "high"})
+    assert updated.priority == "high"
+    assert result.priority == "normal"
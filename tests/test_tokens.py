@@ -0,0 +1,43 @@
+"""
+Tests for token counting and truncation
+"""
+
+import pytest
+from src.penta_cs_agent import tokens
+
+
+class WhitespaceEncoding:
+    """Offline stand-in for a tiktoken encoding: one token per word"""
+
+    def __init__(self):
+        self.encode_calls = 0
+
+    def encode(self, text):
+        self.encode_calls += 1
+        return text.split()
+
+    def decode(self, words):
+        return " ".join(words)
+
+
+@pytest.fixture
+def encoding(monkeypatch):
+    """Replace the tiktoken encoding and reset the count memo"""
+    fake = WhitespaceEncoding()
+    monkeypatch.setattr(tokens, "_get_encoding", lambda: fake)
+    tokens.count_tokens.cache_clear()
+    yield fake
+    tokens.count_tokens.cache_clear()
+
+
+def test_count_tokens_is_memoized(encoding):
+    """Test that a repeated text is only tokenized once"""
+    assert tokens.count_tokens("one two three") == 3
+    assert tokens.count_tokens("one two three") == 3
+    assert encoding.encode_calls == 1
+
+
+def test_truncate_to_tokens(encoding):
+    """Test that only over-budget text is truncated"""
+    assert tokens.truncate_to_tokens("one two three", 5) == "one two three"
+    assert tokens.truncate_to_tokens("one two three", 2) == "one two"
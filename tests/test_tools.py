@@ -2,161 +2,275 @@
 Tests for tool registry and function calling
 """
 
+import json
+import os
+import subprocess
+import sys
 import pytest
-from src.penta_cs_agent.tools import ToolRegistry, default_registry
+from src.penta_cs_agent.tools import ToolRegistry
 
 
-def test_tool_registry_creation():
-    """Test creating a new tool registry"""
-    registry = ToolRegistry()
-    assert registry.get_tool_count() == 0
+# Parameter schemas shared by the tests below. register() keeps its own
+# deep copy, so the same dicts can be passed to many registries
+_PARAM_EMPTY = {"type": "object", "properties": {}}
+_PARAM_STRING = {"type": "object", "properties": {"param": {"type": "string"}}}
+_PARAM_NUMBER_AB = {
+    "type": "object",
+    "properties": {
+        "a": {"type": "number"},
+        "b": {"type": "number"}
+    }
+}
 
+_DEFAULT_TOOL_NAMES = frozenset({"lookup_order", "check_product_availability", "get_shipping_quote"})
 
-def test_tool_registration():
-    """Test registering a tool"""
-    registry = ToolRegistry()
 
-    def test_function(param1: str) -> dict:
-        return {"result": param1}
+# Tool functions shared by the tests below, created once at import
+def _noop() -> dict:
+    return {}
 
-    registry.register(
-        name="test_tool",
-        description="A test tool",
-        parameters={
-            "type": "object",
-            "properties": {
-                "param1": {"type": "string"}
-            }
-        },
-        function=test_function
-    )
 
-    assert registry.get_tool_count() == 1
-    assert "test_tool" in registry.list_tools()
+def _echo(param: str) -> dict:
+    return {"result": param}
+
+
+def _add_numbers(a: int, b: int) -> dict:
+    return {"sum": a + b}
+
+
+def _raise_error():
+    raise RuntimeError("Something went wrong")
+
+
+@pytest.fixture
+def registry():
+    """Create an empty registry for tests that register their own tools"""
+    return ToolRegistry()
 
 
-def test_tool_registration_decorator():
-    """Test registering a tool with decorator"""
+@pytest.fixture(scope="module")
+def populated_registry():
+    """Build one registry of sample tools, shared by tests that only read or call it"""
     registry = ToolRegistry()
+    registry.register("add_numbers", "Add two numbers", _PARAM_NUMBER_AB, _add_numbers)
+    registry.register("error_tool", "A tool that errors", _PARAM_EMPTY, _raise_error)
+    registry.register("test_tool", "Test tool", _PARAM_STRING, _echo)
+    return registry
 
-    @registry.register_decorator(
-        name="decorated_tool",
-        description="A decorated tool",
-        parameters={
-            "type": "object",
-            "properties": {
-                "value": {"type": "number"}
-            }
-        }
-    )
-    def decorated_function(value: int) -> dict:
-        return {"doubled": value * 2}
+
+def test_tool_registry_creation(registry):
+    """Test creating a new tool registry"""
+    assert registry.get_tool_count() == 0
+
+
+@pytest.mark.parametrize("use_decorator", [False, True])
+def test_tool_registration(registry, use_decorator):
+    """Test registering a tool directly and with the decorator"""
+    if use_decorator:
+        decorator = registry.register_decorator(
+            name="test_tool",
+            description="A test tool",
+            parameters=_PARAM_STRING
+        )
+        assert decorator(_echo) is _echo
+    else:
+        registry.register(
+            name="test_tool",
+            description="A test tool",
+            parameters=_PARAM_STRING,
+            function=_echo
+        )
 
     assert registry.get_tool_count() == 1
-    tool = registry.get_tool("decorated_tool")
-    assert tool is not None
-    assert tool.name == "decorated_tool"
+    assert "test_tool" in registry.list_tools()
+    assert "test_tool" in registry
+    assert "other_tool" not in registry
+    tool = registry.get_tool("test_tool")
+    assert tool.name == "test_tool"
+    assert tool.function is _echo
 
 
-def test_tool_calling():
-    """Test calling a registered tool"""
-    registry = ToolRegistry()
+def test_register_many_matches_individual_registration(registry):
+    """Test that bulk registration builds the same definitions as register()"""
+    specs = [
+        {"name": "first", "description": "First tool", "parameters": _PARAM_EMPTY, "function": _noop},
+        {"name": "second", "description": "Second tool", "parameters": _PARAM_STRING, "function": _echo},
+    ]
+    one_by_one = ToolRegistry()
+    for spec in specs:
+        one_by_one.register(**spec)
 
-    @registry.register_decorator(
-        name="add_numbers",
-        description="Add two numbers",
-        parameters={
-            "type": "object",
-            "properties": {
-                "a": {"type": "number"},
-                "b": {"type": "number"}
-            }
-        }
-    )
-    def add_numbers(a: int, b: int) -> dict:
-        return {"sum": a + b}
+    registry.register_many(specs)
+
+    assert registry.list_tools() == ("first", "second")
+    assert registry.fingerprint() == one_by_one.fingerprint()
+    assert registry.get_tool("second").required_args == {"param"}
 
-    result = registry.call_tool("add_numbers", {"a": 5, "b": 3})
+
+def test_tool_calling(populated_registry):
+    """Test calling a registered tool"""
+    result = populated_registry.call_tool("add_numbers", {"a": 5, "b": 3})
     assert result["sum"] == 8
 
 
-def test_tool_calling_nonexistent():
+def test_tool_calling_nonexistent(populated_registry):
     """Test calling a tool that doesn't exist"""
-    registry = ToolRegistry()
+    with pytest.raises(ValueError) as excinfo:
+        populated_registry.call_tool("nonexistent_tool", {})
+    assert "not found" in str(excinfo.value)
 
-    with pytest.raises(ValueError, match="not found"):
-        registry.call_tool("nonexistent_tool", {})
 
-
-def test_tool_calling_with_error():
+def test_tool_calling_with_error(populated_registry):
     """Test tool call that raises an error"""
-    registry = ToolRegistry()
+    result = populated_registry.call_tool("error_tool", {})
+    assert result["error"] == {"type": "RuntimeError", "message": "Something went wrong"}
+    assert result["tool"] == "error_tool"
 
-    @registry.register_decorator(
-        name="error_tool",
-        description="A tool that errors",
-        parameters={"type": "object", "properties": {}}
-    )
-    def error_function():
-        raise RuntimeError("Something went wrong")
 
-    result = registry.call_tool("error_tool", {})
-    assert "error" in result
-    assert "Something went wrong" in result["error"]
+def test_tool_calling_missing_required_arguments(registry):
+    """Test that a call without required arguments is rejected before invoking"""
+    calls = []
 
+    def lookup(order_id: str, verbose: bool = False, *extra, **options):
+        calls.append(order_id)
+        return {"order_id": order_id}
 
-def test_anthropic_format():
-    """Test getting tools in Anthropic format"""
-    registry = ToolRegistry()
+    registry.register("lookup", "Lookup", _PARAM_EMPTY, lookup)
+
+    result = registry.call_tool("lookup", {"verbose": True})
+    assert result == {
+        "error": {"type": "TypeError", "message": "Missing required arguments: order_id"},
+        "tool": "lookup"
+    }
+    assert calls == []
+
+    assert registry.call_tool("lookup", {"order_id": "42"}) == {"order_id": "42"}
+
+
+@pytest.mark.parametrize("arguments", [None, ["42"], "42"])
+def test_tool_calling_with_non_object_arguments(populated_registry, arguments):
+    """Test that arguments that are not a JSON object come back as an error result"""
+    result = populated_registry.call_tool("add_numbers", arguments)
+    assert result == {
+        "error": {"type": "TypeError", "message": "Tool arguments must be an object"},
+        "tool": "add_numbers"
+    }
+
+
+@pytest.mark.parametrize("method_name, tool_type, entry_path, schema_key", [
+    ("get_tool_definitions_for_anthropic", None, (), "input_schema"),
+    ("get_tool_definitions_for_openai", "function", ("function",), "parameters"),
+])
+def test_provider_formats(populated_registry, method_name, tool_type, entry_path, schema_key):
+    """Test getting tools in Anthropic and OpenAI format"""
+    tools = getattr(populated_registry, method_name)()
+    assert len(tools) == populated_registry.get_tool_count()
+    assert all(t.get("type") == tool_type for t in tools)
+
+    entries = list(tools)
+    for key in entry_path:
+        entries = [entry[key] for entry in entries]
+    assert [entry["name"] for entry in entries] == ["add_numbers", "error_tool", "test_tool"]
+
+    tool = entries[-1]
+    assert tool["name"] == "test_tool"
+    assert tool["description"] == "Test tool"
+    assert tool[schema_key] == _PARAM_STRING
+    assert entries[0][schema_key] == _PARAM_NUMBER_AB
+
+
+def test_tool_definitions_cached_until_registration(registry):
+    """Test that provider-format lists and tool names are reused until a tool is registered"""
+    registry.register("first", "First tool", _PARAM_EMPTY, _noop)
 
-    @registry.register_decorator(
+    anthropic_tools = registry.get_tool_definitions_for_anthropic()
+    openai_tools = registry.get_tool_definitions_for_openai()
+    names = registry.list_tools()
+    assert registry.get_tool_definitions_for_anthropic() is anthropic_tools
+    assert registry.get_tool_definitions_for_openai() is openai_tools
+    assert registry.list_tools() is names
+
+    registry.register("second", "Second tool", _PARAM_EMPTY, _noop)
+    assert [t["name"] for t in registry.get_tool_definitions_for_anthropic()] == ["first", "second"]
+    assert [t["function"]["name"] for t in registry.get_tool_definitions_for_openai()] == ["first", "second"]
+    assert registry.list_tools() == ("first", "second")
+
+
+def test_registered_parameters_are_copied(registry):
+    """Test that changing the caller's schema dict does not leak into the registry"""
+    parameters = {"type": "object", "properties": {"q": {"type": "string"}}}
+    registry.register("search", "Search", parameters, _echo)
+    fingerprint = registry.fingerprint()
+
+    parameters["properties"]["q"]["type"] = "number"
+
+    assert registry.get_tool_definitions_for_anthropic()[0]["input_schema"]["properties"]["q"] == {"type": "string"}
+    assert registry.fingerprint() == fingerprint
+
+
+def test_registry_fingerprint(registry):
+    """Test that the fingerprint tracks the registered tool set"""
+    empty = registry.fingerprint()
+
+    registry.register(
         name="test_tool",
         description="Test tool",
-        parameters={
-            "type": "object",
-            "properties": {
-                "param": {"type": "string"}
-            }
-        }
+        parameters=_PARAM_EMPTY,
+        function=_noop
     )
-    def test_func(param: str):
-        return {"result": param}
 
-    tools = registry.get_tool_definitions_for_anthropic()
-    assert len(tools) == 1
-    assert tools[0]["name"] == "test_tool"
-    assert tools[0]["description"] == "Test tool"
-    assert "input_schema" in tools[0]
+    assert registry.fingerprint() != empty
+    assert registry.fingerprint() == registry.fingerprint()
 
 
-def test_openai_format():
-    """Test getting tools in OpenAI format"""
-    registry = ToolRegistry()
-
-    @registry.register_decorator(
+def test_schema_json_serialized_at_registration(registry):
+    """Test that each tool carries its canonical JSON definition"""
+    registry.register(
         name="test_tool",
         description="Test tool",
-        parameters={
-            "type": "object",
-            "properties": {
-                "param": {"type": "string"}
-            }
-        }
+        parameters={"type": "object", "properties": {"b": {}, "a": {}}},
+        function=_noop
     )
-    def test_func(param: str):
-        return {"result": param}
 
-    tools = registry.get_tool_definitions_for_openai()
-    assert len(tools) == 1
-    assert tools[0]["type"] == "function"
-    assert tools[0]["function"]["name"] == "test_tool"
-    assert tools[0]["function"]["description"] == "Test tool"
+    tool = registry.get_tool("test_tool")
+    assert json.loads(tool.schema_json) == registry.get_tool_definitions_for_anthropic()[0]
+    assert tool.schema_json == json.dumps(json.loads(tool.schema_json), sort_keys=True, separators=(",", ":"))
 
 
 def test_default_registry_has_tools():
     """Test that default registry has pre-registered tools"""
+    from src.penta_cs_agent.default_tools import default_registry
+
+    # Read-only: default_registry is shared by every agent built without
+    # a custom registry, so tests must never register into it
     assert default_registry.get_tool_count() > 0
-    tools = default_registry.list_tools()
-    assert "lookup_order" in tools
-    assert "check_product_availability" in tools
-    assert "get_shipping_quote" in tools
+    assert _DEFAULT_TOOL_NAMES <= frozenset(default_registry.list_tools())
+
+
+def test_default_registry_built_on_first_access():
+    """Test that the default registry is built lazily, once, even under concurrent first access"""
+    code = (
+        "import threading\n"
+        "import src.penta_cs_agent.default_tools as default_tools\n"
+        "assert 'default_registry' not in vars(default_tools)\n"
+        "build = default_tools._build_default_registry\n"
+        "builds = []\n"
+        "def slow_build():\n"
+        "    builds.append(None)\n"
+        "    threading.Event().wait(0.05)\n"
+        "    return build()\n"
+        "default_tools._build_default_registry = slow_build\n"
+        "barrier = threading.Barrier(8)\n"
+        "seen = []\n"
+        "def access():\n"
+        "    barrier.wait()\n"
+        "    seen.append(default_tools.default_registry)\n"
+        "threads = [threading.Thread(target=access) for _ in range(8)]\n"
+        "[t.start() for t in threads]\n"
+        "[t.join() for t in threads]\n"
+        "assert len(builds) == 1, builds\n"
+        "assert all(registry is seen[0] for registry in seen) and len(seen) == 8\n"
+        "assert vars(default_tools)['default_registry'] is seen[0] is default_tools.default_registry\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))